@@ -1,5 +1,40 @@
 #!/usr/bin/env python3
-import json, subprocess
+"""
+Polybar i3 workspace list.
+
+Run without arguments to print the list once (interval polling). With --tail
+it keeps one i3 IPC connection open and prints a new line only when the list
+changes; use it from a module with `tail = true`:
+
+    [module/i3-workspaces]
+    type = custom/script
+    exec = ~/.config/polybar/i3-workspaces.py --tail
+    tail = true
+
+Colors and the separator come from i3-workspaces.toml next to this script
+(or --theme); missing keys fall back to THEME.
+"""
+import argparse, json, os, subprocess, sys, tomllib
+from pathlib import Path
+
+THEME = {
+    "before_fg": "#bac2de",
+    "current_bg": "#94e2d5",
+    "current_fg": "#181825",
+    "after_bg": "#45475a",
+    "after_fg": "#bac2de",
+    "separator": "  ",
+}
+THEME_PATH = Path(__file__).with_suffix(".toml")
+
+
+def load_theme(path):
+    """THEME overridden by the keys of a TOML file, if it exists."""
+    try:
+        with open(path, "rb") as f:
+            return {**THEME, **tomllib.load(f)}
+    except (OSError, tomllib.TOMLDecodeError):
+        return dict(THEME)
 
 
 def get_workspaces():
@@ -9,21 +44,117 @@ def get_workspaces():
     return json.loads(result.stdout)
 
 
-workspaces = get_workspaces()
-current = next((ws for ws in workspaces if ws.get("focused")), {"num": 0})["num"]
+class WorkspaceBar:
+    """
+    Polybar line for the workspace list.
 
-formatted = []
-for ws in sorted(workspaces, key=lambda x: x.get("num", 0)):
-    num = ws.get("num", 0)
-    name = ws.get("name", str(num))
+    Each workspace's three styles (before, current, after the focused one)
+    are rendered once and cached. A focus change restyles only the segments
+    between the old and new focus before joining.
+    """
 
-    if num < current:
-        styled = f"%{{F#bac2de}}{name}%{{F-}}"
-    elif num == current:
-        styled = f"%{{B#94e2d5}}%{{F#181825}}{name}%{{F-}}%{{B-}}"
-    else:
-        styled = f"%{{B#45475a}}%{{F#bac2de}}{name}%{{F-}}%{{B-}}"
+    def __init__(self, theme=THEME):
+        self.theme = theme
+        self.line = ""
+        self._fragments = {}  # name -> (before, current, after)
+        self._names = []
+        self._position = {}  # name -> index in _names
+        self._segments = []
+        self._current = -1
+
+    def _styles(self, name):
+        styles = self._fragments.get(name)
+        if styles is None:
+            t = self.theme
+            styles = self._fragments[name] = (
+                f"%{{F{t['before_fg']}}}{name}%{{F-}}",
+                f"%{{B{t['current_bg']}}}%{{F{t['current_fg']}}}{name}%{{F-}}%{{B-}}",
+                f"%{{B{t['after_bg']}}}%{{F{t['after_fg']}}}{name}%{{F-}}%{{B-}}",
+            )
+        return styles
+
+    def _style(self, index):
+        before, current, after = self._styles(self._names[index])
+        if index < self._current:
+            return before
+        if index == self._current:
+            return current
+        return after
+
+    def _join(self):
+        self.line = self.theme["separator"].join(self._segments)
+
+    def update(self, workspaces):
+        """Rebuild from a get_workspaces reply (list of dicts)."""
+        ordered = sorted(workspaces, key=lambda x: x.get("num", 0))
+        self._names = [ws.get("name", str(ws.get("num", 0))) for ws in ordered]
+        self._position = {name: i for i, name in enumerate(self._names)}
+        self._current = next((i for i, ws in enumerate(ordered) if ws.get("focused")), -1)
+        # Forget fragments of workspaces that no longer exist
+        self._fragments = {n: f for n, f in self._fragments.items() if n in self._position}
+        self._segments = [self._style(i) for i in range(len(self._names))]
+        self._join()
 
-    formatted.append(styled)
+    def focus(self, name):
+        """
+        Move focus to a known workspace.
 
-print("  ".join(formatted))
+        Returns:
+            False if the workspace is not in the list and update() is needed
+        """
+        index = self._position.get(name)
+        if index is None:
+            return False
+        old, self._current = self._current, index
+        low, high = (0, len(self._names) - 1) if old < 0 else sorted((old, index))
+        for i in range(low, high + 1):
+            self._segments[i] = self._style(i)
+        self._join()
+        return True
+
+
+def tail(bar):
+    """Print the list on every change, over one long-lived i3 connection."""
+    import i3ipc
+
+    i3 = i3ipc.Connection(auto_reconnect=True)
+    last = None
+
+    def emit():
+        nonlocal last
+        # Urgency and output changes often leave the line unchanged
+        if bar.line != last:
+            print(bar.line, flush=True)
+            last = bar.line
+
+    def on_workspace(i3, event):
+        # Focus changes are applied from the event alone; anything else
+        # (init, empty, rename, move, ...) re-reads the list
+        if not (event.change == "focus" and event.current and bar.focus(event.current.name)):
+            bar.update([ws.ipc_data for ws in i3.get_workspaces()])
+        emit()
+
+    bar.update([ws.ipc_data for ws in i3.get_workspaces()])
+    emit()
+    i3.on(i3ipc.Event.WORKSPACE, on_workspace)
+    try:
+        i3.main()
+    except BrokenPipeError:
+        # polybar went away; keep the exit-time flush from raising again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tail", action="store_true",
+                        help="stay running and print a line whenever the workspace list changes")
+    parser.add_argument("--theme", type=Path, default=THEME_PATH,
+                        help=f"TOML theme file (default: {THEME_PATH.name} next to this script)")
+    args = parser.parse_args()
+
+    bar = WorkspaceBar(load_theme(args.theme))
+    if args.tail:
+        tail(bar)
+    else:
+        bar.update(get_workspaces())
+        print(bar.line)
@@ -4,16 +4,33 @@ Alacritty Focus Highlight Daemon
 
 Brightens the background color of focused Alacritty windows using i3ipc events
 and per-window IPC configuration.
+
+Runs on asyncio: PID lookups and socket writes happen off the event loop, and
+a new focus event supersedes any highlight still pending for a stale window.
+
+Send SIGUSR1 to print per-stage latency percentiles and counters to stderr,
+or set [metrics] stats_socket to read them as JSON from a Unix socket.
 """
 
+import asyncio
 import os
-import subprocess
+import signal
+import sys
 import time
 import tomllib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
 import i3ipc
+from i3ipc.aio import Connection
+
+import colors
+from alacritty_ipc import AlacrittyIPC
+from metrics import Metrics
+from socket_index import SocketIndex
+from window_pid import WindowPidResolver
+from window_store import WindowRecord, WindowStore
 
 
 class AlacrittyFocusHighlight:
@@ -24,16 +41,56 @@ class AlacrittyFocusHighlight:
         self.config = self._load_config(config_path)
         self.base_color = self.config["colors"]["base"]
         self.brightness_pct = self.config["highlight"]["brightness_percentage"]
-
-        # Track state: {window_id: {"original_color": str, "socket": Path}}
-        self.focused_windows = {}
+        fade_ms = self.config["highlight"]["fade_ms"]
+        self.fade_fps = self.config["highlight"]["fade_fps"]
+        self.fade_steps = max(1, round(fade_ms / 1000 * self.fade_fps))
+        self.ipc = AlacrittyIPC(keepalive=self.config["ipc"]["keepalive"])
+        self.pid_resolver = WindowPidResolver()
+        self.socket_index = SocketIndex(Path(f"/run/user/{os.getuid()}"))
+
+        # Per-window socket and colors, bounded by [windows] max_tracked
+        self.windows = WindowStore(self.config["windows"]["max_tracked"])
+
+        # Track state: {window_id: WindowRecord} for highlighted windows
+        self.focused_windows: dict[int, WindowRecord] = {}
         self.previous_focus = None
 
+        # Single workers keep X requests and IPC writes ordered per resource
+        self._x_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="x11")
+        self._ipc_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ipc")
+        self._pending: Optional[asyncio.Task] = None
+        self._pending_window: Optional[int] = None
+
+        # Running fades per window
+        self._fades: dict[int, asyncio.Task] = {}
+
+        # Focus coalescing: events within settle_ms of a burst's first become one transition
+        self.settle_delay = self.config["focus"]["settle_ms"] / 1000
+        self._settle_handle: Optional[asyncio.TimerHandle] = None
+        self._target: Optional[tuple[int, bool, float]] = None
+        self._last_event_alacritty = False
+
+        # Stage latencies and counters, dumped on SIGUSR1 or via stats_socket
+        self.metrics = Metrics()
+        self.counters = self.metrics.counters
+        self.counters.update({
+            "focus_events": 0,
+            "transitions": 0,
+            "ipc_calls": 0,
+            "ipc_calls_uncoalesced": 0,
+            "fade_frames": 0,
+        })
+        self._stats_server: Optional[asyncio.AbstractServer] = None
+
     def _load_config(self, config_path: Path) -> dict:
         """Load configuration from TOML file with fallback defaults."""
         default_config = {
             "colors": {"base": "#101010"},
-            "highlight": {"brightness_percentage": 0.15}
+            "highlight": {"brightness_percentage": 0.15, "fade_ms": 0, "fade_fps": 60},
+            "ipc": {"keepalive": False},
+            "focus": {"settle_ms": 30},
+            "windows": {"max_tracked": 256},
+            "metrics": {"stats_socket": ""},
         }
 
         if not config_path.exists():
@@ -41,14 +98,21 @@ class AlacrittyFocusHighlight:
 
         try:
             with open(config_path, "rb") as f:
-                return tomllib.load(f)
+                loaded = tomllib.load(f)
         except Exception:
             return default_config
 
+        # Fill in sections/keys missing from older config files
+        for section, values in default_config.items():
+            loaded[section] = {**values, **loaded.get(section, {})}
+        return loaded
+
     def brighten_color(self, hex_color: str, percentage: float) -> str:
         """
         Brighten a hex color by a percentage.
 
+        Results are memoized per (color, percentage).
+
         Args:
             hex_color: Hex color string like "#101010"
             percentage: Brightness increase (0.0 to 1.0, e.g., 0.15 = 15% brighter)
@@ -56,22 +120,13 @@ class AlacrittyFocusHighlight:
         Returns:
             Brightened hex color string
         """
-        # Remove '#' and parse RGB
-        hex_color = hex_color.lstrip('#')
-        r = int(hex_color[0:2], 16)
-        g = int(hex_color[2:4], 16)
-        b = int(hex_color[4:6], 16)
-
-        # Brighten by moving toward white (255)
-        r = min(255, int(r + (255 - r) * percentage))
-        g = min(255, int(g + (255 - g) * percentage))
-        b = min(255, int(b + (255 - b) * percentage))
-
-        return f"#{r:02x}{g:02x}{b:02x}"
+        return colors.brighten(hex_color, percentage)
 
     def get_window_pid(self, window_id: int) -> Optional[int]:
         """
-        Get the PID of a window using xprop.
+        Get the PID of a window from _NET_WM_PID.
+
+        Lookups are cached per window until the window closes.
 
         Args:
             window_id: X11 window ID
@@ -79,186 +134,382 @@ class AlacrittyFocusHighlight:
         Returns:
             Process ID or None if not found
         """
-        try:
-            result = subprocess.run(
-                ["/usr/bin/xprop", "-id", str(window_id), "_NET_WM_PID"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            # Output format: "_NET_WM_PID(CARDINAL) = 12345"
-            if "=" in result.stdout:
-                return int(result.stdout.split("=")[1].strip())
-        except (subprocess.CalledProcessError, ValueError, IndexError):
-            pass
-        return None
-
-    def _find_socket_once(self, pid: int) -> Optional[Path]:
+        with self.metrics.timer("get_window_pid"):
+            pid = self.pid_resolver.get_pid(window_id)
+        if pid is None:
+            self.metrics.incr("pid_failures")
+        return pid
+
+    async def find_alacritty_socket(self, pid: int, timeout: float = 0.5) -> Optional[Path]:
         """
-        Attempt to find the Alacritty IPC socket once (without retry).
+        Find the Alacritty IPC socket for a given PID.
 
         Socket path format: /run/user/<UID>/Alacritty-<DISPLAY>-<PID>.sock
 
+        Known sockets are a dict lookup in the socket index. For a window that
+        was just created the socket may not exist yet when the focus event
+        fires; the lookup then waits until inotify reports it (or timeout).
+
         Args:
             pid: Process ID of Alacritty instance
+            timeout: Maximum time to wait for the socket in seconds (default: 0.5)
 
         Returns:
-            Path to socket file or None if not found
+            Path to socket file or None if not found in time
         """
-        uid = os.getuid()
-        display = os.environ.get("DISPLAY", ":0")
-
-        socket_path = Path(f"/run/user/{uid}/Alacritty-{display}-{pid}.sock")
+        start = time.perf_counter()
+        socket = self.socket_index.get(pid)
+        if socket is None:
+            # Socket not created yet; count the wait like the old retry loop
+            self.metrics.incr("socket_waits")
+            socket = await self.socket_index.wait_for(pid, timeout)
+        self.metrics.record("find_alacritty_socket", time.perf_counter() - start)
+        if socket is None:
+            self.metrics.incr("socket_failures")
+        return socket
 
-        if socket_path.exists():
-            return socket_path
+    def send_alacritty_color(self, socket: Path, color: str, window_id: int) -> bool:
+        """
+        Send color configuration to Alacritty via IPC.
 
-        # Fallback: search for any socket matching the PID
-        run_dir = Path(f"/run/user/{uid}")
-        if run_dir.exists():
-            for socket in run_dir.glob(f"Alacritty-*-{pid}.sock"):
-                return socket
+        Writes the config message straight to the socket instead of spawning
+        `alacritty msg`.
 
-        return None
+        Args:
+            socket: Path to Alacritty IPC socket
+            color: Hex color string
+            window_id: X11 window ID to apply config to
 
-    def find_alacritty_socket(self, pid: int, max_retries: int = 5, delay: float = 0.1) -> Optional[Path]:
+        Returns:
+            True if successful, False otherwise
+        """
+        with self.metrics.timer("send_alacritty_color"):
+            ok = self.ipc.set_config(
+                socket,
+                [f"colors.primary.background='{color}'"],
+                window_id
+            )
+        if not ok:
+            self.metrics.incr("send_failures")
+        return ok
+
+    def _submit_ipc(self, socket: Path, color: str, window_id: int) -> asyncio.Future:
+        """Queue a color write on the IPC worker without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self._ipc_executor, self.send_alacritty_color, socket, color, window_id
+        )
+
+    def _set_color(self, record: WindowRecord, color: str) -> asyncio.Future:
         """
-        Find the Alacritty IPC socket for a given PID with retry logic.
+        Transition a window's background to a color.
 
-        This handles the race condition when new Alacritty windows are created
-        and the socket may not exist yet when the focus event fires.
+        With fading enabled, the precomputed gradient from the color currently
+        shown is streamed at fade_fps; otherwise the color is written once. A new
+        transition replaces any fade still running on the same window.
 
         Args:
-            pid: Process ID of Alacritty instance
-            max_retries: Maximum number of attempts (default: 5)
-            delay: Delay between retries in seconds (default: 0.1)
+            record: Tracked window to recolor
+            color: Target hex color
 
         Returns:
-            Path to socket file or None if not found after all retries
+            Future resolving when the last write has been queued
         """
-        for attempt in range(max_retries):
-            socket = self._find_socket_once(pid)
-            if socket:
-                return socket
-            if attempt < max_retries - 1:
-                time.sleep(delay)
-
-        return None
-
-    def send_alacritty_color(self, socket: Path, color: str, window_id: int) -> bool:
+        self.metrics.incr("ipc_calls")
+        window_id = record.window_id
+        fade = self._fades.pop(window_id, None)
+        if fade:
+            fade.cancel()
+
+        start = record.shown_color or record.original_color
+        if self.fade_steps <= 1 or start == color:
+            record.shown_color = color
+            return self._submit_ipc(record.socket, color, window_id)
+
+        frames = colors.gradient(start, color, self.fade_steps)
+        task = asyncio.ensure_future(self._fade(record, frames))
+        self._fades[window_id] = task
+        return task
+
+    async def _fade(self, record: WindowRecord, frames: tuple[str, ...]):
+        """Stream precomputed fade frames to a window at a fixed frame rate."""
+        window_id = record.window_id
+        socket = record.socket
+        interval = 1 / self.fade_fps
+        loop = asyncio.get_running_loop()
+        next_frame = loop.time()
+        try:
+            for color in frames:
+                # The slot was released or reused for another window
+                if record.window_id != window_id:
+                    return
+                record.shown_color = color
+                self.metrics.incr("fade_frames")
+                self._submit_ipc(socket, color, window_id)
+                next_frame += interval
+                await asyncio.sleep(max(0.0, next_frame - loop.time()))
+        finally:
+            if self._fades.get(window_id) is asyncio.current_task():
+                del self._fades[window_id]
+
+    def query_window_background(self, socket: Path, window_id: int) -> Optional[str]:
         """
-        Send color configuration to Alacritty via IPC.
+        Read a window's current background color over IPC.
+
+        Requires Alacritty 0.14+ (get-config); older versions return None.
 
         Args:
             socket: Path to Alacritty IPC socket
-            color: Hex color string
-            window_id: X11 window ID to apply config to
+            window_id: X11 window ID
 
         Returns:
-            True if successful, False otherwise
+            Hex color string or None if it could not be read
         """
+        config = self.ipc.get_config(socket, window_id)
         try:
-            subprocess.run(
-                [
-                    "alacritty",
-                    "msg",
-                    "--socket", str(socket),
-                    "config",
-                    "--window-id", str(window_id),
-                    f"colors.primary.background='{color}'"
-                ],
-                capture_output=True,
-                check=True
-            )
-            return True
-        except subprocess.CalledProcessError:
-            return False
+            color = config["colors"]["primary"]["background"]
+        except (TypeError, KeyError):
+            return None
+        if isinstance(color, dict):
+            # Serialized as its components, e.g. {"r": 16, "g": 16, "b": 16}
+            try:
+                color = "#{:02x}{:02x}{:02x}".format(color["r"], color["g"], color["b"])
+            except (KeyError, TypeError, ValueError):
+                return None
+        if not isinstance(color, str):
+            return None
+        # Alacritty accepts both "#rrggbb" and "0xrrggbb"
+        color = color.lower().replace("0x", "#", 1)
+        if len(color) != 7 or not color.startswith("#"):
+            return None
+        return color
+
+    async def _get_window_pid_async(self, window_id: int) -> Optional[int]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._x_executor, self.get_window_pid, window_id)
+
+    def _cancel_pending(self):
+        """Drop highlight work still in flight for a window that lost focus."""
+        if self._pending and not self._pending.done():
+            self._pending.cancel()
+        self._pending = None
+        self._pending_window = None
+
+    async def _highlight_window(self, window_id: int, received_at: Optional[float] = None,
+                                capture: bool = True):
+        """
+        Resolve a window's socket and brighten its background.
 
-    def on_window_focus(self, i3: i3ipc.Connection, event: i3ipc.Event):
+        Args:
+            window_id: X11 window ID
+            received_at: perf_counter() time of the focus event, for end-to-end latency
+            capture: Read the window's own background on first sighting; off
+                when the window may still show a previous run's highlight
+        """
+        pid = await self._get_window_pid_async(window_id)
+        if not pid:
+            return
+
+        socket = await self.find_alacritty_socket(pid)
+        if not socket:
+            return
+
+        record = self.windows.acquire(window_id)
+        if record.socket != socket or record.original_color is None:
+            # First sighting: capture the window's own background before touching it
+            original = None
+            if capture:
+                loop = asyncio.get_running_loop()
+                original = await loop.run_in_executor(
+                    self._ipc_executor, self.query_window_background, socket, window_id
+                )
+            record = self.windows.acquire(window_id)
+            record.socket = socket
+            record.original_color = original or self.base_color
+            record.highlight_color = self.brighten_color(record.original_color, self.brightness_pct)
+
+        # Store state before queueing the write so a later restore follows it
+        self.focused_windows[window_id] = record
+        await self._set_color(record, record.highlight_color)
+        if received_at is not None:
+            self.metrics.record("focus_to_color", time.perf_counter() - received_at)
+
+    @property
+    def ipc_calls_saved(self) -> int:
+        """IPC calls avoided compared to handling every focus event individually."""
+        return self.counters["ipc_calls_uncoalesced"] - self.counters["ipc_calls"]
+
+    def on_window_focus(self, i3: Connection, event: i3ipc.Event):
         """
         Handle i3 window focus events.
 
+        Events are coalesced: the latest focus target is recorded and the
+        transition is applied settle_ms after the first event of a burst, so
+        a steady stream of events still applies one transition per settle
+        window. The handler only schedules work, so it returns immediately.
+        """
+        received_at = time.perf_counter()
+        window = event.container
+        is_alacritty = window.window_class == "Alacritty"
+
+        # Uncoalesced handling restores the previous window and brightens this one
+        self.metrics.incr("focus_events")
+        self.metrics.incr("ipc_calls_uncoalesced", self._last_event_alacritty + is_alacritty)
+        self._last_event_alacritty = is_alacritty
+
+        self._target = (window.window, is_alacritty, received_at)
+        if self.settle_delay <= 0:
+            self._apply_focus()
+        elif self._settle_handle is None:
+            # Not re-armed by later events: the burst's first event bounds the wait
+            loop = asyncio.get_running_loop()
+            self._settle_handle = loop.call_later(self.settle_delay, self._apply_focus)
+        self.metrics.record("on_window_focus", time.perf_counter() - received_at)
+
+    def _apply_focus(self):
+        """
+        Apply the final focus transition of a burst.
+
         When an Alacritty window gains focus, brighten its background.
         When focus leaves an Alacritty window, restore original background.
+        Windows whose state did not change are left alone.
         """
-        window = event.container
-        window_id = window.window
+        self._settle_handle = None
+        if self._target is None:
+            return
+        window_id, is_alacritty, received_at = self._target
+        self._target = None
+
+        # Still resolving this window from an earlier transition
+        if self._pending_window == window_id and self._pending and not self._pending.done():
+            return
+        if self.previous_focus == window_id and (window_id in self.focused_windows or not is_alacritty):
+            return
+
+        self.metrics.incr("transitions")
+
+        # Anything still resolving for the old focus is stale now
+        self._cancel_pending()
 
         # Restore previous window color if it was Alacritty
         if self.previous_focus and self.previous_focus in self.focused_windows:
-            prev_state = self.focused_windows[self.previous_focus]
-            self.send_alacritty_color(
-                prev_state["socket"],
-                prev_state["original_color"],
-                self.previous_focus
-            )
-            del self.focused_windows[self.previous_focus]
+            prev_record = self.focused_windows.pop(self.previous_focus)
+            if prev_record.window_id == self.previous_focus:
+                self._set_color(prev_record, prev_record.original_color)
 
         # Check if new focus is Alacritty
-        if window.window_class == "Alacritty":
-            pid = self.get_window_pid(window_id)
-            if not pid:
-                self.previous_focus = window_id
-                return
-
-            socket = self.find_alacritty_socket(pid)
-            if not socket:
-                self.previous_focus = window_id
-                return
-
-            # Store state and apply brightened color
-            bright_color = self.brighten_color(self.base_color, self.brightness_pct)
-            self.focused_windows[window_id] = {
-                "original_color": self.base_color,
-                "socket": socket
-            }
-            self.send_alacritty_color(socket, bright_color, window_id)
+        if is_alacritty:
+            self._pending = asyncio.ensure_future(self._highlight_window(window_id, received_at))
+            self._pending_window = window_id
 
         self.previous_focus = window_id
 
-    def on_window_close(self, i3: i3ipc.Connection, event: i3ipc.Event):
+    def on_window_close(self, i3: Connection, event: i3ipc.Event):
         """
         Handle window close events to cleanup state.
 
         Remove closed windows from tracking to prevent memory leaks.
         """
         window_id = event.container.window
+        if self._pending_window == window_id:
+            self._cancel_pending()
+        if self._target and self._target[0] == window_id:
+            self._target = None
+        self.pid_resolver.invalidate(window_id)
+        fade = self._fades.pop(window_id, None)
+        if fade:
+            fade.cancel()
+        self.windows.release(window_id)
         if window_id in self.focused_windows:
             del self.focused_windows[window_id]
         if self.previous_focus == window_id:
             self.previous_focus = None
 
-    def highlight_current_focus(self, i3: i3ipc.Connection):
+    async def highlight_current_focus(self, i3: Connection):
         """Highlight the currently focused window on startup."""
-        focused = i3.get_tree().find_focused()
+        tree = await i3.get_tree()
+        focused = tree.find_focused()
         if focused and focused.window_class == "Alacritty":
-            window_id = focused.window
-
-            pid = self.get_window_pid(window_id)
-            if pid:
-                socket = self.find_alacritty_socket(pid)
-                if socket:
-                    bright_color = self.brighten_color(self.base_color, self.brightness_pct)
-                    self.focused_windows[window_id] = {
-                        "original_color": self.base_color,
-                        "socket": socket
-                    }
-                    self.send_alacritty_color(socket, bright_color, window_id)
-                    self.previous_focus = window_id
+            self._last_event_alacritty = True
+            self.metrics.incr("ipc_calls_uncoalesced")
+            self.previous_focus = focused.window
+            # If a previous run was stopped while this window was highlighted,
+            # its background is already brightened; capturing it as the
+            # original would brighten it again on every restart
+            await self._highlight_window(focused.window, capture=False)
+
+    def dump_metrics(self):
+        """Print stage latencies and counters to stderr."""
+        self.metrics.set("ipc_calls_saved", self.ipc_calls_saved)
+        print(self.metrics.format("alacritty-focus-highlight metrics"), file=sys.stderr, flush=True)
+
+    async def _serve_stats(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Reply to a stats socket client with a JSON snapshot and hang up."""
+        self.metrics.set("ipc_calls_saved", self.ipc_calls_saved)
+        writer.write(self.metrics.to_json().encode() + b"\n")
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _start_stats_socket(self) -> Optional[asyncio.AbstractServer]:
+        path = self.config["metrics"]["stats_socket"]
+        if not path:
+            return None
+        path = Path(os.path.expandvars(os.path.expanduser(path)))
+        path.unlink(missing_ok=True)
+        return await asyncio.start_unix_server(self._serve_stats, path=str(path))
+
+    async def start(self, i3):
+        """
+        Start socket watching and the stats socket, then highlight the current focus.
 
-    def run(self):
-        """Start the daemon and listen for i3 events."""
-        i3 = i3ipc.Connection()
+        Used by the standalone daemon and by hosts that own the i3 connection
+        and forward window::focus/close events to on_window_focus/on_window_close.
+        """
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGUSR1, self.dump_metrics)
+        self.socket_index.start(loop)
+        self._stats_server = await self._start_stats_socket()
+
+        # Highlight the currently focused window immediately
+        await self.highlight_current_focus(i3)
+
+    def stop(self):
+        """Stop the watchers started by start(); call from the event loop."""
+        self.socket_index.stop()
+        if self._stats_server:
+            self._stats_server.close()
+            self._stats_server = None
+
+    def close(self):
+        """Release executors and connections once the event loop has finished."""
+        self._ipc_executor.shutdown(wait=True)
+        self._x_executor.shutdown(wait=True)
+        self.ipc.close()
+        self.pid_resolver.close()
+
+    async def _run(self):
+        i3 = await Connection(auto_reconnect=True).connect()
 
         # Subscribe to focus and close events
         i3.on(i3ipc.Event.WINDOW_FOCUS, self.on_window_focus)
         i3.on(i3ipc.Event.WINDOW_CLOSE, self.on_window_close)
 
-        # Highlight the currently focused window immediately
-        self.highlight_current_focus(i3)
+        await self.start(i3)
 
         # Start event loop
-        i3.main()
+        try:
+            await i3.main()
+        finally:
+            self.stop()
+
+    def run(self):
+        """Start the daemon and listen for i3 events."""
+        try:
+            asyncio.run(self._run())
+        finally:
+            self.close()
 
 
 def main():
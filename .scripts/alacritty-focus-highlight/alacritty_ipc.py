@@ -0,0 +1,175 @@
+"""
+In-process Alacritty IPC client.
+
+Speaks the same JSON protocol as `alacritty msg` directly over the
+Alacritty-*.sock Unix socket, so recoloring a window costs a socket write
+instead of a fork+exec of the alacritty binary.
+"""
+
+import json
+import select
+import socket as sock
+from pathlib import Path
+from typing import Optional
+
+
+class AlacrittyIPC:
+    """Sends config messages to Alacritty IPC sockets, one pooled connection per socket."""
+
+    def __init__(self, keepalive: bool = False, timeout: float = 0.5):
+        """
+        Initialize the client.
+
+        Args:
+            keepalive: Reuse one connection per socket across messages. Alacritty
+                0.13+ reads a single message per connection and then drops it,
+                so only enable this for servers that read until EOF.
+            timeout: Connect/send timeout in seconds
+        """
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self._pool: dict[Path, sock.socket] = {}
+
+    def _connect(self, path: Path) -> sock.socket:
+        conn = sock.socket(sock.AF_UNIX, sock.SOCK_STREAM)
+        conn.settimeout(self.timeout)
+        try:
+            conn.connect(str(path))
+        except OSError:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _is_alive(conn: sock.socket) -> bool:
+        """Check whether the peer is still attached to a pooled connection."""
+        try:
+            readable, _, _ = select.select([conn], [], [], 0)
+            if not readable:
+                return True
+            data = conn.recv(1, sock.MSG_PEEK)
+        except OSError:
+            return False
+        # An empty read means the server closed its end
+        return bool(data)
+
+    def _get_connection(self, path: Path) -> sock.socket:
+        conn = self._pool.get(path)
+        if conn is not None and self._is_alive(conn):
+            return conn
+        if conn is not None:
+            self.close(path)
+        conn = self._connect(path)
+        self._pool[path] = conn
+        return conn
+
+    def send(self, path: Path, message: dict) -> bool:
+        """
+        Send one JSON message to an Alacritty socket.
+
+        Args:
+            path: Path to Alacritty IPC socket
+            message: Message object, e.g. {"Config": {...}}
+
+        Returns:
+            True if the message was written, False otherwise
+        """
+        payload = json.dumps(message).encode() + b"\n"
+
+        if not self.keepalive:
+            try:
+                conn = self._connect(path)
+            except OSError:
+                return False
+            try:
+                conn.sendall(payload)
+                return True
+            except OSError:
+                return False
+            finally:
+                conn.close()
+
+        # Retry once on a fresh connection if the pooled one went stale
+        for _ in range(2):
+            try:
+                conn = self._get_connection(path)
+            except OSError:
+                # Socket disappeared (window closed) or refuses connections
+                self.close(path)
+                return False
+            try:
+                conn.sendall(payload)
+                return True
+            except OSError:
+                self.close(path)
+        return False
+
+    def set_config(self, path: Path, options: list[str], window_id: Optional[int] = None) -> bool:
+        """
+        Apply runtime config options, like `alacritty msg config`.
+
+        Args:
+            path: Path to Alacritty IPC socket
+            options: Config options such as "colors.primary.background='#101010'"
+            window_id: X11 window ID to apply config to (None for all windows)
+
+        Returns:
+            True if the message was written, False otherwise
+        """
+        return self.send(path, {
+            "Config": {
+                "options": options,
+                "window_id": window_id,
+                "reset": False,
+            }
+        })
+
+    def get_config(self, path: Path, window_id: Optional[int] = None) -> Optional[dict]:
+        """
+        Fetch a window's live config, like `alacritty msg get-config`.
+
+        Always uses a fresh connection since the reply ends the exchange.
+        Alacritty versions without get-config close without replying.
+        The reply is {"GetConfig": "<config as JSON text>"}; the text is
+        decoded here.
+
+        Args:
+            path: Path to Alacritty IPC socket
+            window_id: X11 window ID to query (None for the socket's window)
+
+        Returns:
+            Config as a dict, or None if unavailable
+        """
+        payload = json.dumps({"GetConfig": {"window_id": window_id}}).encode() + b"\n"
+        try:
+            conn = self._connect(path)
+        except OSError:
+            return None
+        try:
+            conn.sendall(payload)
+            conn.shutdown(sock.SHUT_WR)
+            with conn.makefile("rb") as stream:
+                line = stream.readline()
+            reply = json.loads(line) if line else None
+        except (OSError, ValueError):
+            return None
+        finally:
+            conn.close()
+
+        if not isinstance(reply, dict):
+            return None
+        config = reply.get("GetConfig")
+        if isinstance(config, str):
+            try:
+                config = json.loads(config)
+            except ValueError:
+                return None
+        return config if isinstance(config, dict) else None
+
+    def close(self, path: Optional[Path] = None):
+        """Close the pooled connection for one socket, or all of them."""
+        paths = [path] if path is not None else list(self._pool)
+        for p in paths:
+            conn = self._pool.pop(p, None)
+            if conn is not None:
+                conn.close()
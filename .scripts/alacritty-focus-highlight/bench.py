@@ -0,0 +1,610 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Alacritty focus daemons.
+
+  bench.py ipc      Latency of one color update: in-process socket client
+                    versus forking `alacritty msg`
+  bench.py replay   Replay a recorded or synthetic i3 focus/close stream into
+                    AlacrittyFocusHighlight and alacritty_bg_event.Manager
+  bench.py record   Record live i3 focus/close events for later replay
+  bench.py startup  Time alacritty_bg_event's startup window map
+
+Everything runs headless: Alacritty is replaced by fake IPC socket servers and
+the xprop/ps/alacritty commands are stubbed (optionally still paying a real
+fork+exec each, so process spawns cost what they would in production).
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import re
+import shutil
+import socket as sock
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from alacritty_ipc import AlacrittyIPC
+
+COLOR_RE = re.compile(r"""['"]?(#[0-9a-fA-F]{6})['"]?$""")
+
+
+class FakeAlacrittyServer:
+    """Unix socket server that accepts Alacritty IPC messages and records them."""
+
+    def __init__(self, path: Path, one_shot: bool = True, window_id: Optional[int] = None,
+                 background: str = "#101010", receipts: Optional[list] = None):
+        """
+        Args:
+            path: Socket path to listen on
+            one_shot: Read a single message per connection like Alacritty 0.13+,
+                otherwise read messages until the client disconnects
+            window_id: Window that messages with no/negative window ID apply to
+            background: Background reported to GetConfig requests
+            receipts: List that (time, window_id, color) tuples are appended to
+        """
+        self.path = path
+        self.one_shot = one_shot
+        self.window_id = window_id
+        self.background = background
+        self.receipts = receipts if receipts is not None else []
+        self.messages = 0
+        self._server = sock.socket(sock.AF_UNIX, sock.SOCK_STREAM)
+        self._server.bind(str(path))
+        self._server.listen(64)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        # shutdown() wakes the thread blocked in accept()
+        try:
+            self._server.shutdown(sock.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.close()
+        self.path.unlink(missing_ok=True)
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with conn, conn.makefile("rb") as stream:
+                for line in stream:
+                    self.messages += 1
+                    self._handle(conn, line)
+                    if self.one_shot:
+                        break
+
+    def _handle(self, conn: sock.socket, line: bytes):
+        received = time.perf_counter()
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+
+        if "GetConfig" in message:
+            # Alacritty replies with the config serialized as a JSON string
+            config = {"colors": {"primary": {"background": self.background}}}
+            reply = {"GetConfig": json.dumps(config)}
+            try:
+                conn.sendall(json.dumps(reply).encode() + b"\n")
+            except OSError:
+                pass
+            return
+
+        config = message.get("Config")
+        if not config or not config.get("options"):
+            return
+        match = COLOR_RE.search(config["options"][-1])
+        window_id = config.get("window_id")
+        if window_id is None or window_id < 0:
+            window_id = self.window_id
+        if match:
+            self.receipts.append((received, window_id, match.group(1).lower()))
+
+
+# ── ipc ──────────────────────────────────────────────────────────────────────
+
+
+def _summarize(label: str, samples: list[float]):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{label:<36} mean {statistics.mean(samples) * 1e3:8.3f} ms"
+        f"  p50 {statistics.median(samples) * 1e3:8.3f} ms"
+        f"  p95 {p95 * 1e3:8.3f} ms"
+    )
+
+
+def bench_ipc(path: Path, iterations: int, keepalive: bool) -> list[float]:
+    ipc = AlacrittyIPC(keepalive=keepalive)
+    samples = []
+    for i in range(iterations):
+        color = "#1a1a1a" if i % 2 else "#101010"
+        start = time.perf_counter()
+        ipc.set_config(path, [f"colors.primary.background='{color}'"], 1)
+        samples.append(time.perf_counter() - start)
+    ipc.close()
+    return samples
+
+
+def bench_subprocess(path: Path, iterations: int) -> list[float]:
+    samples = []
+    for i in range(iterations):
+        color = "#1a1a1a" if i % 2 else "#101010"
+        start = time.perf_counter()
+        subprocess.run(
+            [
+                "alacritty", "msg", "--socket", str(path), "config",
+                "--window-id", "1", f"colors.primary.background='{color}'"
+            ],
+            capture_output=True
+        )
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def cmd_ipc(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"Alacritty-bench-{os.getpid()}.sock"
+
+        with FakeAlacrittyServer(path, one_shot=True):
+            _summarize("socket (per message)", bench_ipc(path, args.iterations, False))
+            if shutil.which("alacritty"):
+                _summarize("alacritty msg", bench_subprocess(path, args.iterations))
+            else:
+                print("alacritty msg                        skipped (alacritty not in PATH)")
+
+        with FakeAlacrittyServer(path, one_shot=False):
+            _summarize("socket (keepalive)", bench_ipc(path, args.iterations, True))
+
+
+# ── replay ───────────────────────────────────────────────────────────────────
+
+
+def synthetic_events(count: int, windows: int, rate: float, seed: int, burst: int = 1,
+                     alacritty_ratio: float = 0.8, close_ratio: float = 0.02) -> list[dict]:
+    """
+    Generate a focus/close event stream over a rotating set of windows.
+
+    Events come in bursts of `burst` events 5 ms apart (like keyboard focus
+    cycling), with bursts spaced so the average rate is `rate` events/sec.
+
+    Returns:
+        Events as {"t": seconds, "change": "focus"|"close", "window": id, "class": str}
+    """
+    rng = random.Random(seed)
+    next_id = 0x1000001
+
+    def new_window():
+        nonlocal next_id
+        next_id += 1
+        return next_id, "Alacritty" if rng.random() < alacritty_ratio else "firefox"
+
+    live = dict(new_window() for _ in range(windows))
+    burst = max(1, burst)
+    burst_interval = burst / rate if rate > 0 else 0.0
+    step = min(0.005, burst_interval / burst)
+    events = []
+    for i in range(count):
+        window = rng.choice(list(live))
+        change = "close" if rng.random() < close_ratio else "focus"
+        t = (i // burst) * burst_interval + (i % burst) * step
+        events.append({"t": t, "change": change, "window": window, "class": live[window]})
+        if change == "close":
+            del live[window]
+            window, cls = new_window()
+            live[window] = cls
+    return events
+
+
+def load_events(path: Path, rate: float) -> list[dict]:
+    """Load a recorded stream; a positive rate overrides recorded timestamps."""
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    if rate > 0:
+        for i, event in enumerate(events):
+            event["t"] = i / rate
+    return events
+
+
+class SpawnStub:
+    """
+    Stands in for subprocess.run/check_output while a replay runs.
+
+    Answers xprop and ps with canned output, forwards `alacritty msg config`
+    to the fake socket servers in-process, and counts every would-be spawn.
+    """
+
+    def __init__(self, pids: dict[int, int], fork_cost: bool):
+        self.pids = pids
+        self.fork_cost = fork_cost
+        self.spawns = 0
+        self._ipc = AlacrittyIPC()
+        self._run = subprocess.run
+        self._check_output = subprocess.check_output
+
+    def __enter__(self):
+        subprocess.run = self.run
+        subprocess.check_output = self.check_output
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.run = self._run
+        subprocess.check_output = self._check_output
+
+    def _output(self, cmd: list[str], env: Optional[dict]) -> str:
+        self.spawns += 1
+        if self.fork_cost:
+            self._run(["true"])
+
+        name = os.path.basename(cmd[0])
+        if name == "xprop":
+            pid = self.pids.get(int(cmd[cmd.index("-id") + 1]))
+            return f"_NET_WM_PID(CARDINAL) = {pid}\n" if pid else "_NET_WM_PID:  not found.\n"
+        if name == "ps":
+            return "1\n"
+        if name == "alacritty" and "config" in cmd:
+            socket = (env or os.environ).get("ALACRITTY_SOCKET")
+            window_id = None
+            for flag in ("--socket", "--window-id", "-w"):
+                if flag in cmd:
+                    value = cmd[cmd.index(flag) + 1]
+                    if flag == "--socket":
+                        socket = value
+                    else:
+                        window_id = int(value)
+            if socket:
+                self._ipc.set_config(Path(socket), [cmd[-1]], window_id)
+        return ""
+
+    def run(self, cmd, *args, env=None, capture_output=False, text=False, check=False, **kwargs):
+        out = self._output(cmd, env)
+        stdout = out if text else out.encode()
+        return subprocess.CompletedProcess(cmd, 0, stdout if capture_output else None, None)
+
+    def check_output(self, cmd, *args, env=None, text=False, **kwargs):
+        out = self._output(cmd, env)
+        return out if text else out.encode()
+
+
+def _event(window_id: int, window_class: str):
+    container = type("Container", (), {"window": window_id, "window_class": window_class})()
+    return type("Event", (), {"container": container})()
+
+
+def _latencies(dispatched: list[tuple[float, int]], receipts: list, active_color: str) -> list[float]:
+    """Match each highlight write to the latest focus event dispatched to that window before it."""
+    focus_times: dict[int, list[float]] = {}
+    for sent, window_id in dispatched:
+        focus_times.setdefault(window_id, []).append(sent)
+    latencies = []
+    for received, window_id, color in receipts:
+        if color != active_color:
+            continue
+        times = focus_times.get(window_id, [])
+        i = bisect.bisect_right(times, received)
+        if i:
+            latencies.append(received - times[i - 1])
+    return latencies
+
+
+def _report(name: str, events: list[dict], elapsed: float, spawns: int, receipts: list, latencies: list[float]):
+    lat = sorted(latencies) or [0.0]
+
+    def pct(p):
+        return lat[min(len(lat) - 1, max(0, round(p / 100 * len(lat)) - 1))] * 1e3
+
+    print(f"{name}")
+    print(f"  events            {len(events)}")
+    print(f"  events/sec        {len(events) / elapsed:,.0f}")
+    print(f"  color writes      {len(receipts)}")
+    print(f"  spawns/event      {spawns / len(events):.3f}")
+    print(f"  e2e latency ms    p50 {pct(50):.3f}  p95 {pct(95):.3f}  p99 {pct(99):.3f}  max {lat[-1] * 1e3:.3f}")
+
+
+async def _replay_focus_highlight(events: list[dict], run_dir: Path, config_path: Path, settle_ms: Optional[float]):
+    import window_pid
+    from alacritty_focus_highlight import AlacrittyFocusHighlight
+    from socket_index import SocketIndex
+
+    # Resolve PIDs through the (stubbed) xprop path instead of a live X server
+    window_pid.xdisplay = None
+
+    daemon = AlacrittyFocusHighlight(config_path)
+    if settle_ms is not None:
+        daemon.settle_delay = settle_ms / 1000
+    loop = asyncio.get_running_loop()
+    daemon.socket_index = SocketIndex(run_dir)
+    daemon.socket_index.start(loop)
+
+    dispatched = []
+    start = time.perf_counter()
+    for event in events:
+        delay = start + event["t"] - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        e = _event(event["window"], event["class"])
+        if event["change"] == "focus":
+            dispatched.append((time.perf_counter(), event["window"]))
+            daemon.on_window_focus(None, e)
+        else:
+            daemon.on_window_close(None, e)
+        # Let scheduled work run between back-to-back events
+        await asyncio.sleep(0)
+
+    # Drain coalescing timers, pending highlights, fades and queued writes
+    while (daemon._settle_handle or daemon._fades
+           or (daemon._pending and not daemon._pending.done())):
+        await asyncio.sleep(0.001)
+    await loop.run_in_executor(daemon._ipc_executor, lambda: None)
+    elapsed = time.perf_counter() - start
+
+    daemon.socket_index.stop()
+    daemon._ipc_executor.shutdown()
+    daemon._x_executor.shutdown()
+    active_color = daemon.brighten_color(daemon.base_color, daemon.brightness_pct)
+    return dispatched, elapsed, active_color
+
+
+def _import_bg_event():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import alacritty_bg_event
+    return alacritty_bg_event
+
+
+def _replay_bg_event(events: list[dict], sockets: dict[int, Path]):
+    alacritty_bg_event = _import_bg_event()
+
+    run_dir = next(iter(sockets.values())).parent if sockets else Path(tempfile.gettempdir())
+
+    class FakeTree:
+        def leaves(self):
+            return []
+
+        def find_focused(self):
+            return None
+
+    class FakeI3:
+        def get_tree(self):
+            return FakeTree()
+
+    class ReplayManager(alacritty_bg_event.Manager):
+        """Manager with a prebuilt socket map and no i3 connection or output."""
+
+        def _build_map(self, *args, **kwargs):
+            self._index_sockets(str(run_dir))
+            self.sockets = {str(w): str(s) for w, s in sockets.items()}
+
+        def _log(self, *args, **fields):
+            pass
+
+    manager = ReplayManager(i3=FakeI3())
+    manager.next_reconcile = float("inf")
+    on_close = getattr(manager, "on_close", None)
+
+    dispatched = []
+    start = time.perf_counter()
+    for event in events:
+        delay = start + event["t"] - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        e = _event(event["window"], event["class"])
+        if event["change"] == "focus":
+            dispatched.append((time.perf_counter(), event["window"]))
+            manager.on_focus(None, e)
+        elif on_close:
+            on_close(None, e)
+    elapsed = time.perf_counter() - start
+    return dispatched, elapsed, alacritty_bg_event.ACTIVE_BG.lower()
+
+
+def cmd_replay(args):
+    if args.events:
+        events = load_events(args.events, args.rate)
+    else:
+        events = synthetic_events(args.count, args.windows, args.rate, args.seed, args.burst)
+
+    # One fake Alacritty process (PID + socket) per Alacritty window
+    windows = sorted({e["window"] for e in events if e["class"] == "Alacritty"})
+    pids = {window: 100000 + i for i, window in enumerate(windows)}
+    config_path = Path(__file__).parent / "config.toml"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp)
+        sockets = {w: run_dir / f"Alacritty-:0-{pid}.sock" for w, pid in pids.items()}
+
+        for target in args.daemons:
+            receipts = []
+            servers = [
+                FakeAlacrittyServer(sockets[w], window_id=w, receipts=receipts)
+                for w in windows
+            ]
+            for server in servers:
+                server.__enter__()
+            try:
+                with SpawnStub(pids, fork_cost=not args.no_fork_cost) as stub:
+                    if target == "focus-highlight":
+                        dispatched, elapsed, active = asyncio.run(
+                            _replay_focus_highlight(events, run_dir, config_path, args.settle_ms)
+                        )
+                        name = "AlacrittyFocusHighlight"
+                    else:
+                        dispatched, elapsed, active = _replay_bg_event(events, sockets)
+                        name = "alacritty_bg_event.Manager"
+                # Let the server threads record the last writes
+                time.sleep(0.05)
+            finally:
+                for server in servers:
+                    server.__exit__(None, None, None)
+            _report(name, events, elapsed, stub.spawns, receipts,
+                    _latencies(dispatched, receipts, active))
+
+
+# ── startup ──────────────────────────────────────────────────────────────────
+
+
+def fake_proc_tree(root: Path, processes: int, terminals: int, children: bool = True) -> Path:
+    """
+    Write a /proc-like tree plus runtime dir with `terminals` Alacritty
+    processes (socket + shell child) among `processes` entries.
+
+    Every process gets a stat file; task/<tid>/children files are only
+    written with `children`, like a kernel built with CONFIG_PROC_CHILDREN.
+
+    Returns:
+        The fake runtime dir holding the Alacritty sockets
+    """
+    proc = root / "proc"
+    run_dir = root / "run"
+    proc.mkdir()
+    run_dir.mkdir()
+    pid = 1
+    for i in range(terminals):
+        alacritty, shell = pid, pid + 1
+        pid += 2
+        for p, comm, ppid in ((alacritty, "alacritty", 1), (shell, "zsh", alacritty)):
+            (proc / str(p) / "task" / str(p)).mkdir(parents=True)
+            (proc / str(p) / "stat").write_text(f"{p} ({comm}) S {ppid} {p} {p} 0 -1 4194560\n")
+            if children:
+                (proc / str(p) / "task" / str(p) / "children").write_text("")
+        if children:
+            (proc / str(alacritty) / "task" / str(alacritty) / "children").write_text(f"{shell} ")
+        (proc / str(shell) / "environ").write_bytes(
+            b"SHELL=/bin/zsh\x00ALACRITTY_WINDOW_ID=%d\x00TERM=alacritty\x00" % (0x2000000 + i)
+        )
+        (run_dir / f"Alacritty-:0-{alacritty}.sock").touch()
+    while pid <= processes:
+        (proc / str(pid)).mkdir()
+        (proc / str(pid) / "stat").write_text(f"{pid} (kworker/{pid}) S 2 0 0 0 -1 69238880\n")
+        pid += 1
+    return run_dir
+
+
+def cmd_startup(args):
+    bg = _import_bg_event()
+
+    class StartupManager(bg.Manager):
+        """Manager without an i3 connection that only counts what it maps."""
+
+        def __init__(self, scan_workers: int = 0):
+            self.sockets = {}
+            self.scan_workers = scan_workers
+            self.debug = False
+
+        def _log(self, *args, **fields):
+            pass
+
+    def time_scan(run_dir: Optional[str], proc_root: str, workers: int = 0) -> list[float]:
+        samples = []
+        for _ in range(args.repeat):
+            manager = StartupManager(workers)
+            start = time.perf_counter()
+            manager._build_map(run_dir, proc_root)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    label = f"synthetic ({args.terminals} sockets, {args.procs} procs)"
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = fake_proc_tree(Path(tmp), args.procs, args.terminals)
+        _summarize(f"{label}, task children", time_scan(str(run_dir), str(Path(tmp) / "proc")))
+    # Kernels without CONFIG_PROC_CHILDREN: the /proc/*/stat fallback
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = fake_proc_tree(Path(tmp), args.procs, args.terminals, children=False)
+        for workers in (0, args.workers):
+            _summarize(
+                f"{label}, stat scan, {workers or 1} thread(s)",
+                time_scan(str(run_dir), str(Path(tmp) / "proc"), workers)
+            )
+    _summarize("live runtime dir", time_scan(None, bg.PROC_ROOT))
+
+
+# ── record ───────────────────────────────────────────────────────────────────
+
+
+def cmd_record(args):
+    import i3ipc
+
+    i3 = i3ipc.Connection()
+    start = time.monotonic()
+    out = open(args.output, "w")
+
+    def write(change):
+        def handler(_, event):
+            out.write(json.dumps({
+                "t": round(time.monotonic() - start, 6),
+                "change": change,
+                "window": event.container.window,
+                "class": event.container.window_class,
+            }) + "\n")
+            out.flush()
+        return handler
+
+    i3.on(i3ipc.Event.WINDOW_FOCUS, write("focus"))
+    i3.on(i3ipc.Event.WINDOW_CLOSE, write("close"))
+    print(f"Recording focus/close events to {args.output} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        i3.main()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command")
+
+    ipc = sub.add_parser("ipc", help="single color update latency")
+    ipc.add_argument("-n", "--iterations", type=int, default=500)
+
+    replay = sub.add_parser("replay", help="replay focus/close events into the daemons")
+    replay.add_argument("--events", type=Path, help="recorded JSON-lines stream (default: synthetic)")
+    replay.add_argument("-n", "--count", type=int, default=500, help="synthetic events")
+    replay.add_argument("--windows", type=int, default=20, help="synthetic live windows")
+    replay.add_argument("--rate", type=float, default=50, help="average events/sec (0: back to back)")
+    replay.add_argument("--burst", type=int, default=4, help="synthetic events per focus-cycling burst")
+    replay.add_argument("--seed", type=int, default=1)
+    replay.add_argument("--settle-ms", type=float, help="override [focus] settle_ms")
+    replay.add_argument("--no-fork-cost", action="store_true",
+                        help="do not fork a real process for each stubbed command")
+    replay.add_argument("--daemons", nargs="+", default=["focus-highlight", "bg-event"],
+                        choices=["focus-highlight", "bg-event"])
+
+    record = sub.add_parser("record", help="record live i3 focus/close events")
+    record.add_argument("output", type=Path)
+
+    startup = sub.add_parser("startup", help="time alacritty_bg_event's startup window map")
+    startup.add_argument("--procs", type=int, default=5000, help="synthetic process count")
+    startup.add_argument("--terminals", type=int, default=40, help="synthetic Alacritty processes")
+    startup.add_argument("--workers", type=int, default=4, help="threads for the stat fallback scan")
+    startup.add_argument("--repeat", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "replay":
+        cmd_replay(args)
+    elif args.command == "record":
+        cmd_record(args)
+    elif args.command == "startup":
+        cmd_startup(args)
+    else:
+        if args.command is None:
+            args = ipc.parse_args([])
+        cmd_ipc(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Memoized color transforms for the focus highlight daemon.
+
+Hex parsing, brightening and fade gradients are computed once per distinct
+input and served from cache afterwards.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def parse_hex(hex_color: str) -> tuple[int, int, int]:
+    """
+    Parse a hex color into an RGB tuple.
+
+    Args:
+        hex_color: Hex color string like "#101010"
+
+    Returns:
+        (r, g, b) with components in 0-255
+    """
+    hex_color = hex_color.lstrip('#')
+    return (
+        int(hex_color[0:2], 16),
+        int(hex_color[2:4], 16),
+        int(hex_color[4:6], 16),
+    )
+
+
+def to_hex(rgb: tuple[int, int, int]) -> str:
+    """Format an RGB tuple as a hex color string."""
+    return "#{:02x}{:02x}{:02x}".format(*rgb)
+
+
+@lru_cache(maxsize=256)
+def brighten(hex_color: str, percentage: float) -> str:
+    """
+    Brighten a hex color by a percentage.
+
+    Args:
+        hex_color: Hex color string like "#101010"
+        percentage: Brightness increase (0.0 to 1.0, e.g., 0.15 = 15% brighter)
+
+    Returns:
+        Brightened hex color string
+    """
+    # Brighten by moving toward white (255)
+    return to_hex(tuple(
+        min(255, int(c + (255 - c) * percentage)) for c in parse_hex(hex_color)
+    ))
+
+
+@lru_cache(maxsize=128)
+def gradient(start: str, end: str, steps: int) -> tuple[str, ...]:
+    """
+    Precompute the frames of a linear fade between two colors.
+
+    Args:
+        start: Hex color the fade starts from (not included)
+        end: Hex color the fade ends on (always the last frame)
+        steps: Number of frames
+
+    Returns:
+        Tuple of hex color strings, one per frame
+    """
+    a = parse_hex(start)
+    b = parse_hex(end)
+    frames = []
+    for i in range(1, steps + 1):
+        t = i / steps
+        frames.append(to_hex(tuple(round(x + (y - x) * t) for x, y in zip(a, b))))
+    return tuple(frames)
@@ -0,0 +1,121 @@
+"""
+Lightweight latency and counter metrics for the focus highlight daemon.
+
+Each stage keeps a ring of its most recent samples for percentiles plus
+lifetime count/total, so recording is O(1) and memory stays flat.
+Samples and counters arrive from the event loop and from the X11 and IPC
+worker threads, so Metrics serializes updates and snapshots with a lock.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class LatencyHistogram:
+    """Latency samples for one stage over a bounded window."""
+
+    def __init__(self, window: int = 4096):
+        """
+        Args:
+            window: Number of most recent samples used for percentiles
+        """
+        self._samples = [0.0] * window
+        self._next = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """Add one latency sample."""
+        self._samples[self._next] = seconds
+        self._next = (self._next + 1) % len(self._samples)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct: float) -> float:
+        """Return the pct percentile (0-100) of the recent samples, in seconds."""
+        filled = min(self.count, len(self._samples))
+        if not filled:
+            return 0.0
+        ordered = sorted(self._samples[:filled])
+        index = min(filled - 1, max(0, round(pct / 100 * filled) - 1))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        """Summary in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p95_ms": self.percentile(95) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+            "max_ms": self.max * 1e3,
+        }
+
+
+class Metrics:
+    """Per-stage latency histograms plus named counters; safe to use from any thread."""
+
+    def __init__(self):
+        self.stages: dict[str, LatencyHistogram] = {}
+        self.counters: dict[str, int] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        """Record a latency sample for a stage."""
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def incr(self, name: str, amount: int = 1):
+        """Increment a named counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name: str, value: int):
+        """Set a named counter to a derived value."""
+        with self._lock:
+            self.counters[name] = value
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Time the enclosed block as one sample of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """All stages and counters as plain data."""
+        with self._lock:
+            return {
+                "uptime_s": time.time() - self.started,
+                "stages": {name: h.snapshot() for name, h in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def format(self, title: Optional[str] = None) -> str:
+        """Human-readable table of stages and counters."""
+        snap = self.snapshot()
+        lines = [title] if title else []
+        lines.append(f"uptime {snap['uptime_s']:.0f}s")
+        lines.append(f"{'stage':<24}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, s in snap["stages"].items():
+            lines.append(
+                f"{name:<24}{s['count']:>8}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}"
+                f"{s['p99_ms']:>10.3f}{s['max_ms']:>10.3f}"
+            )
+        for name, value in snap["counters"].items():
+            lines.append(f"{name:<24}{value:>8}")
+        return "\n".join(lines)
@@ -0,0 +1,194 @@
+"""
+inotify-backed index of Alacritty IPC sockets.
+
+Keeps {pid: socket path} for every Alacritty-<DISPLAY>-<PID>.sock in the
+runtime dir, updated from inotify create/delete events, so lookups are a dict
+hit and a newly created socket wakes its waiters immediately. Falls back to
+rescanning the directory when inotify is unavailable.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import re
+import struct
+from pathlib import Path
+from typing import Optional
+
+SOCKET_RE = re.compile(r"^Alacritty-.+-(\d+)\.sock$")
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class SocketIndex:
+    """Tracks Alacritty IPC sockets in a runtime directory, keyed by PID."""
+
+    def __init__(self, run_dir: Path, poll_interval: float = 0.1):
+        """
+        Initialize the index and populate it from the current directory contents.
+
+        Args:
+            run_dir: Directory holding Alacritty sockets (usually /run/user/<UID>)
+            poll_interval: Rescan interval used only when inotify is unavailable
+        """
+        self.run_dir = run_dir
+        self.poll_interval = poll_interval
+        self._sockets: dict[int, Path] = {}
+        self._waiters: dict[int, list[asyncio.Future]] = {}
+        self._fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.rescan()
+
+    @property
+    def watching(self) -> bool:
+        """True when inotify keeps the index current."""
+        return self._fd is not None
+
+    def rescan(self):
+        """Rebuild the index from a full directory listing."""
+        sockets = {}
+        try:
+            names = os.listdir(self.run_dir)
+        except OSError:
+            names = []
+        for name in names:
+            match = SOCKET_RE.match(name)
+            if match:
+                sockets[int(match.group(1))] = self.run_dir / name
+        self._sockets = sockets
+        for pid in list(self._waiters):
+            if pid in sockets:
+                self._wake(pid)
+
+    def get(self, pid: int) -> Optional[Path]:
+        """Return the indexed socket for a PID without touching the filesystem."""
+        return self._sockets.get(pid)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> bool:
+        """
+        Start watching the runtime dir with inotify on the given event loop.
+
+        Returns:
+            True if inotify watching is active, False if falling back to rescans
+        """
+        self._loop = loop
+        libc = _load_libc()
+        if libc is None:
+            return False
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        mask = IN_CREATE | IN_DELETE | IN_MOVED_TO | IN_MOVED_FROM
+        if libc.inotify_add_watch(fd, os.fsencode(self.run_dir), mask) < 0:
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        loop.add_reader(fd, self._on_readable)
+        # Catch sockets created between the initial scan and the watch
+        self.rescan()
+        return True
+
+    def stop(self):
+        """Stop watching and release the inotify descriptor."""
+        if self._fd is not None:
+            if self._loop is not None:
+                self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.stop()
+            return
+
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.rescan()
+                continue
+
+            match = SOCKET_RE.match(name)
+            if not match:
+                continue
+            pid = int(match.group(1))
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._sockets[pid] = self.run_dir / name
+                self._wake(pid)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._sockets.pop(pid, None)
+
+    def _wake(self, pid: int):
+        for future in self._waiters.pop(pid, []):
+            if not future.done():
+                future.set_result(self._sockets[pid])
+
+    async def wait_for(self, pid: int, timeout: float) -> Optional[Path]:
+        """
+        Return the socket for a PID, waiting up to timeout for it to appear.
+
+        Args:
+            pid: Process ID of Alacritty instance
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            Path to socket file or None if it did not appear in time
+        """
+        socket = self._sockets.get(pid)
+        if socket is not None or timeout <= 0:
+            return socket
+
+        if not self.watching:
+            return await self._poll_for(pid, timeout)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(pid, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(pid)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[pid]
+
+    async def _poll_for(self, pid: int, timeout: float) -> Optional[Path]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            self.rescan()
+            socket = self._sockets.get(pid)
+            if socket is not None:
+                return socket
+        return None
@@ -0,0 +1,108 @@
+"""
+Cached X11 window → PID resolver.
+
+Reads _NET_WM_PID over a persistent X connection (python-xlib) and caches the
+result per window, so repeated focus events on known windows fork nothing.
+Falls back to xprop when python-xlib is not installed.
+"""
+
+import subprocess
+from typing import Optional
+
+try:
+    from Xlib import X, display as xdisplay, error as xerror
+except ImportError:
+    xdisplay = None
+
+
+class WindowPidResolver:
+    """Resolves and caches _NET_WM_PID for X11 windows."""
+
+    def __init__(self):
+        """Initialize the resolver; the X connection is opened lazily."""
+        self._cache: dict[int, int] = {}
+        self._display = None
+        self._pid_atom = None
+        self.lookups = 0
+        self.cache_hits = 0
+        self.forks = 0
+
+    def get_pid(self, window_id: int) -> Optional[int]:
+        """
+        Get the PID of a window, using the cache when possible.
+
+        Args:
+            window_id: X11 window ID
+
+        Returns:
+            Process ID or None if not found
+        """
+        self.lookups += 1
+        pid = self._cache.get(window_id)
+        if pid is not None:
+            self.cache_hits += 1
+            return pid
+
+        pid = self._query_xlib(window_id) if xdisplay else None
+        if pid is None and not self._display:
+            pid = self._query_xprop(window_id)
+
+        if pid is not None:
+            self._cache[window_id] = pid
+        return pid
+
+    def invalidate(self, window_id: int):
+        """Drop a window from the cache (call when the window closes)."""
+        self._cache.pop(window_id, None)
+
+    def _connect(self) -> bool:
+        """Open the persistent X connection if it is not open yet."""
+        if self._display is not None:
+            return True
+        try:
+            self._display = xdisplay.Display()
+            self._pid_atom = self._display.intern_atom("_NET_WM_PID")
+        except Exception:
+            self._display = None
+            return False
+        return True
+
+    def _query_xlib(self, window_id: int) -> Optional[int]:
+        """Read _NET_WM_PID in-process."""
+        if not self._connect():
+            return None
+        try:
+            window = self._display.create_resource_object("window", window_id)
+            prop = window.get_full_property(self._pid_atom, X.AnyPropertyType)
+        except (xerror.BadWindow, xerror.BadValue, xerror.BadMatch):
+            return None
+        except (xerror.ConnectionClosedError, OSError):
+            # X server went away; reconnect on the next lookup
+            self._display = None
+            return None
+        if prop is None or len(prop.value) == 0:
+            return None
+        return int(prop.value[0])
+
+    def _query_xprop(self, window_id: int) -> Optional[int]:
+        """Read _NET_WM_PID by forking xprop."""
+        self.forks += 1
+        try:
+            result = subprocess.run(
+                ["/usr/bin/xprop", "-id", str(window_id), "_NET_WM_PID"],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            # Output format: "_NET_WM_PID(CARDINAL) = 12345"
+            if "=" in result.stdout:
+                return int(result.stdout.split("=")[1].strip())
+        except (subprocess.CalledProcessError, ValueError, IndexError, OSError):
+            pass
+        return None
+
+    def close(self):
+        """Close the X connection."""
+        if self._display is not None:
+            self._display.close()
+            self._display = None
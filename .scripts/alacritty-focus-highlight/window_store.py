@@ -0,0 +1,93 @@
+"""
+Bounded per-window state for the focus highlight daemon.
+
+Records live in a fixed number of preallocated slots and are reused through a
+free list, so memory stays flat no matter how many terminals come and go.
+When every slot is taken the least recently used window is evicted.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+
+class WindowRecord:
+    """State cached for one Alacritty window."""
+
+    __slots__ = ("window_id", "socket", "original_color", "highlight_color", "shown_color", "last_used")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Reset the record so its slot can be reused."""
+        self.window_id: Optional[int] = None
+        self.socket: Optional[Path] = None
+        self.original_color: Optional[str] = None
+        self.highlight_color: Optional[str] = None
+        self.shown_color: Optional[str] = None
+        self.last_used = 0
+
+
+class WindowStore:
+    """Fixed-capacity, slot-based store of WindowRecords keyed by window ID."""
+
+    def __init__(self, capacity: int = 256):
+        """
+        Args:
+            capacity: Maximum number of windows tracked at once
+        """
+        self.capacity = max(1, capacity)
+        self._slots = [WindowRecord() for _ in range(self.capacity)]
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._index: dict[int, int] = {}
+        self._clock = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, window_id: int) -> bool:
+        return window_id in self._index
+
+    def get(self, window_id: int) -> Optional[WindowRecord]:
+        """Return the record for a window and mark it as recently used."""
+        slot = self._index.get(window_id)
+        if slot is None:
+            return None
+        record = self._slots[slot]
+        self._clock += 1
+        record.last_used = self._clock
+        return record
+
+    def acquire(self, window_id: int) -> WindowRecord:
+        """
+        Return the record for a window, claiming a slot if it has none yet.
+
+        Newly claimed records are cleared apart from window_id.
+        """
+        record = self.get(window_id)
+        if record is not None:
+            return record
+
+        if not self._free:
+            self._evict()
+        slot = self._free.pop()
+        record = self._slots[slot]
+        record.clear()
+        record.window_id = window_id
+        self._clock += 1
+        record.last_used = self._clock
+        self._index[window_id] = slot
+        return record
+
+    def release(self, window_id: int):
+        """Forget a window and return its slot to the free list."""
+        slot = self._index.pop(window_id, None)
+        if slot is not None:
+            self._slots[slot].clear()
+            self._free.append(slot)
+
+    def _evict(self):
+        slot = min(self._index.values(), key=lambda s: self._slots[s].last_used)
+        self.evictions += 1
+        self.release(self._slots[slot].window_id)
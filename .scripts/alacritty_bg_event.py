@@ -4,65 +4,349 @@ Event-driven Alacritty background color manager.
 Changes background color based on i3 window focus.
 """
 
+import argparse
+import json
+import logging
+import logging.handlers
 import os
+import queue
+import re
 import sys
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 import i3ipc
 
-# Ensure output is unbuffered
-sys.stdout.reconfigure(line_buffering=True)
+log = logging.getLogger("alacritty_bg_event")
 
 ACTIVE_BG = "#1A1A20"
 INACTIVE_BG = "#101010"
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any structured fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname.lower(),
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry)
+
+
+def setup_logging(level="info", json_output=False):
+    """
+    Route log records through a queue to a background writer thread.
+
+    The hot path only enqueues records; formatting and stdout writes happen
+    on the listener thread. Returns the started QueueListener.
+    """
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if json_output else logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(records, handler)
+
+    log.addHandler(logging.handlers.QueueHandler(records))
+    log.setLevel(level.upper())
+    log.propagate = False
+    listener.start()
+    return listener
+
+
+PROC_ROOT = "/proc"
+RECONCILE_INTERVAL = 60  # seconds between drift checks against the i3 tree
+RECOLOR_WORKERS = 8  # concurrent `alacritty msg` processes for the initial recolor
+
+SOCKET_RE = re.compile(r"^Alacritty-(.+)-(\d+)\.sock$")
+
+
+def runtime_dir():
+    """Directory holding this user's Alacritty sockets."""
+    return os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+
+
+def socket_name(display, pid):
+    """Name of an Alacritty IPC socket, as created by Alacritty."""
+    return f"Alacritty-{display}-{pid}.sock"
+
+
+def index_sockets(run_dir):
+    """
+    Map Alacritty PIDs to their IPC sockets.
+
+    Socket path format: <run_dir>/Alacritty-<DISPLAY>-<PID>.sock. Sockets of
+    every DISPLAY are indexed.
+    """
+    sockets = {}
+    try:
+        names = os.listdir(run_dir)
+    except OSError:
+        return sockets
+    for name in names:
+        match = SOCKET_RE.match(name)
+        if match:
+            sockets[match.group(2)] = os.path.join(run_dir, name)
+    return sockets
+
+
+def read_stat(pid, proc_root=PROC_ROOT):
+    """Return (comm, ppid) from /proc/<pid>/stat, or None if the process is gone."""
+    try:
+        with open(f"{proc_root}/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # comm is wrapped in parens and may itself contain spaces or parens
+    start = data.find(b"(")
+    end = data.rfind(b")")
+    try:
+        ppid = int(data[end + 2:].split(b" ", 2)[1])
+    except (IndexError, ValueError):
+        return None
+    return data[start + 1:end].decode(errors="replace"), ppid
+
+
+def read_stats(pids, proc_root=PROC_ROOT, workers=0):
+    """Read (comm, ppid) for many PIDs, optionally split across a thread pool."""
+    if workers <= 1:
+        return {pid: read_stat(pid, proc_root) for pid in pids}
+
+    def scan(chunk):
+        return [(pid, read_stat(pid, proc_root)) for pid in chunk]
+
+    chunks = [pids[i::workers] for i in range(workers)]
+    stats = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(scan, chunks):
+            stats.update(part)
+    return stats
+
+
+def child_table(proc_root=PROC_ROOT, workers=0):
+    """Map every PID to its child PIDs from one pass over /proc/*/stat."""
+    pids = [d for d in os.listdir(proc_root) if d.isdigit()]
+    table = {}
+    for pid, info in read_stats(pids, proc_root, workers).items():
+        if info:
+            table.setdefault(str(info[1]), []).append(pid)
+    return table
+
+
+def children_missing(pid, proc_root=PROC_ROOT):
+    """True if the process exists but the kernel lacks task/*/children (no CONFIG_PROC_CHILDREN)."""
+    task = f"{proc_root}/{pid}/task/{pid}"
+    return os.path.isdir(task) and not os.path.exists(f"{task}/children")
+
+
+def read_window_id(pid, proc_root=PROC_ROOT):
+    """Return ALACRITTY_WINDOW_ID from a process environment, or None."""
+    try:
+        with open(f"{proc_root}/{pid}/environ", "rb") as f:
+            for line in f.read().split(b"\x00"):
+                if line.startswith(b"ALACRITTY_WINDOW_ID="):
+                    return line.split(b"=")[1].decode()
+    except OSError:
+        pass
+    return None
+
+
+def read_children(pid, proc_root=PROC_ROOT):
+    """Return child PIDs of a process from /proc/<pid>/task/*/children."""
+    children = []
+    try:
+        tasks = os.listdir(f"{proc_root}/{pid}/task")
+    except OSError:
+        return children
+    for tid in tasks:
+        try:
+            with open(f"{proc_root}/{pid}/task/{tid}/children") as f:
+                children.extend(f.read().split())
+        except OSError:
+            pass
+    return children
+
+
+def window_ids(alacritty_pid, proc_root=PROC_ROOT, children=None):
+    """
+    ALACRITTY_WINDOW_ID of every child of an Alacritty process, whatever the shell.
+
+    Children are read from /proc/<pid>/task/*/children unless given, e.g.
+    from a child_table() on kernels without that file.
+    """
+    ids = set()
+    if children is None:
+        children = read_children(alacritty_pid, proc_root)
+    for child in children:
+        x11_id = read_window_id(child, proc_root)
+        if x11_id:
+            ids.add(x11_id)
+    return ids
+
+
+def get_window_pid(x11_id):
+    """Get _NET_WM_PID of a window using xprop."""
+    try:
+        out = subprocess.check_output(
+            ["xprop", "-id", x11_id, "_NET_WM_PID"], stderr=subprocess.DEVNULL
+        ).decode()
+        # Output format: "_NET_WM_PID(CARDINAL) = 12345"
+        return out.split("=")[1].strip()
+    except (subprocess.CalledProcessError, OSError, IndexError):
+        return None
+
+
 class Manager:
-    def __init__(self):
-        self.i3 = i3ipc.Connection()
+    def __init__(self, i3=None, scan_workers=0):
+        # A host process may share its connection; it must offer get_tree()
+        self.i3 = i3 or i3ipc.Connection()
+        self.scan_workers = scan_workers
         self.sockets = {}  # X11 ID -> socket
+        self.run_dir = runtime_dir()
+        self.socket_index = {}  # Alacritty PID -> socket
+        self.displays = set()  # DISPLAYs seen in socket names
+        self.window_pids = {}  # X11 ID -> Alacritty PID, for windows not mapped yet
+        self.unresolved = set()  # Alacritty windows not mapped yet
         self.focused_x11_id = None
+        self.next_reconcile = time.monotonic() + RECONCILE_INTERVAL
+        # Shared by every `alacritty msg`; the socket is passed with --socket
+        self.env = os.environ.copy()
+        # Checked before building per-window/per-event messages
+        self.debug = log.isEnabledFor(logging.DEBUG)
         self._log("Initializing...")
         self._build_map()
     
-    def _log(self, message):
-        """Log message with newline and flush."""
-        sys.stdout.write(message + "\n")
-        sys.stdout.flush()
+    def _log(self, message, level=logging.INFO, **fields):
+        """Queue a log record; fields are included in JSON output."""
+        log.log(level, message, extra={"fields": fields})
     
-    def _build_map(self):
-        """Map X11 window IDs to Alacritty sockets."""
+    def _index_sockets(self, run_dir=None):
+        """(Re)build the PID -> socket index from one listing of the runtime dir."""
+        self.run_dir = run_dir or runtime_dir()
+        self.socket_index = index_sockets(self.run_dir)
+        self.displays = {
+            SOCKET_RE.match(os.path.basename(sock)).group(1)
+            for sock in self.socket_index.values()
+        }
+        if os.environ.get("DISPLAY"):
+            self.displays.add(os.environ["DISPLAY"])
+
+    def _socket_for(self, pid):
+        """
+        Socket of one Alacritty process, adding new processes to the index.
+
+        Only the socket names this PID can have (one per known DISPLAY) are
+        checked; the runtime dir is listed again only by reconcile().
+        """
+        sock = self.socket_index.get(pid)
+        if sock:
+            return sock
+        for display in self.displays:
+            sock = os.path.join(self.run_dir, socket_name(display, pid))
+            if os.path.exists(sock):
+                self.socket_index[pid] = sock
+                return sock
+        return None
+
+    def _build_map(self, run_dir=None, proc_root=PROC_ROOT):
+        """
+        Map X11 window IDs to Alacritty sockets.
+
+        Starts from the sockets in the runtime dir and reads
+        ALACRITTY_WINDOW_ID from the children of each socket's process, so
+        the cost grows with the number of sockets, not with all processes.
+        Kernels without /proc/<pid>/task/*/children fall back to one pass
+        over /proc/*/stat (split across --scan-workers threads).
+        """
+        start = time.perf_counter()
+        self._index_sockets(run_dir)
         self.sockets = {}
-        count = 0
-        for pid in [d for d in os.listdir("/proc") if d.isdigit()]:
-            try:
-                # Check if it's a zsh process
-                with open("/proc/" + pid + "/comm") as f:
-                    if f.read().strip() != "zsh":
-                        continue
-                
-                # Get parent PID
-                ppid = subprocess.check_output(["ps", "-o", "ppid=", "-p", pid]).decode().strip()
-                
-                # Check if parent is alacritty
-                with open("/proc/" + ppid + "/comm") as f:
-                    if f.read().strip() != "alacritty":
-                        continue
-                
-                # Get ALACRITTY_WINDOW_ID from environment
-                with open("/proc/" + pid + "/environ", "rb") as f:
-                    for line in f.read().split(b"\x00"):
-                        if line.startswith(b"ALACRITTY_WINDOW_ID="):
-                            x11_id = line.split(b"=")[1].decode()
-                            # Build socket path
-                            sock = f"/run/user/1000/Alacritty-:0-{ppid}.sock"
-                            if os.path.exists(sock):
-                                self.sockets[x11_id] = sock
-                                count += 1
-                                self._log(f"  Found window {x11_id} on socket {ppid}")
-            except:
-                pass
-        
-        self._log(f"Mapped {count} Alacritty windows")
-    
+        table = None
+
+        for pid, sock in self.socket_index.items():
+            if table is None and children_missing(pid, proc_root):
+                table = child_table(proc_root, self.scan_workers)
+            children = table.get(pid, []) if table is not None else None
+            for x11_id in window_ids(pid, proc_root, children):
+                self.sockets[x11_id] = sock
+                if self.debug:
+                    self._log(f"  Found window {x11_id} on socket {pid}", logging.DEBUG)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self._log(
+            f"Mapped {len(self.sockets)} Alacritty windows from {len(self.socket_index)} sockets "
+            f"in {self.run_dir} ({elapsed:.1f} ms)",
+            windows=len(self.sockets), sockets=len(self.socket_index), duration_ms=round(elapsed, 3)
+        )
+
+    def _resolve_window(self, x11_id, proc_root=PROC_ROOT):
+        """
+        Map a single window without scanning /proc.
+
+        Looks up the window's Alacritty PID (xprop, once per window), then
+        checks only that process's children for its ALACRITTY_WINDOW_ID.
+        Returns True if the window was mapped.
+        """
+        pid = self.window_pids.get(x11_id) or get_window_pid(x11_id)
+        if not pid:
+            return False
+        self.window_pids[x11_id] = pid
+        sock = self._socket_for(pid)
+        if not sock:
+            return False
+        children = None
+        if children_missing(pid, proc_root):
+            children = child_table(proc_root, self.scan_workers).get(pid, [])
+        if x11_id not in window_ids(pid, proc_root, children):
+            return False
+        self.sockets[x11_id] = sock
+        self.unresolved.discard(x11_id)
+        self.window_pids.pop(x11_id, None)
+        self._log(f"Mapped new window {x11_id} on socket {pid}", window=x11_id)
+        return True
+
+    def reconcile(self):
+        """
+        Correct drift between the map and the windows i3 knows about.
+
+        Drops entries for windows or sockets that are gone, re-lists the
+        runtime dir (new DISPLAYs, stale sockets) and resolves Alacritty
+        windows missing from the map, one window at a time.
+        """
+        self.next_reconcile = time.monotonic() + RECONCILE_INTERVAL
+        self._index_sockets(self.run_dir)
+        live = {
+            str(c.window) for c in self.i3.get_tree().leaves()
+            if c.window_class == "Alacritty"
+        }
+        for x11_id in list(self.sockets):
+            if x11_id not in live or not os.path.exists(self.sockets[x11_id]):
+                del self.sockets[x11_id]
+        self.unresolved = (self.unresolved & live) | (live - set(self.sockets))
+        self.window_pids = {w: p for w, p in self.window_pids.items() if w in self.unresolved}
+        for x11_id in list(self.unresolved):
+            self._resolve_window(x11_id)
+
+    def on_new(self, i3, e):
+        """Map a newly opened Alacritty window."""
+        if not e.container or e.container.window_class != "Alacritty":
+            return
+        x11_id = str(e.container.window)
+        # The shell may not have started yet; focus/reconcile will retry
+        if not self._resolve_window(x11_id):
+            self.unresolved.add(x11_id)
+
+    def on_close(self, i3, e):
+        """Drop a closed window from the map."""
+        if not e.container:
+            return
+        x11_id = str(e.container.window)
+        self.sockets.pop(x11_id, None)
+        self.unresolved.discard(x11_id)
+        self.window_pids.pop(x11_id, None)
+        if self.focused_x11_id == x11_id:
+            self.focused_x11_id = None
+
     def set_bg(self, x11_id, active):
         """Set background color for a window."""
         if x11_id not in self.sockets:
@@ -71,60 +355,73 @@ class Manager:
         sock = self.sockets[x11_id]
         color = ACTIVE_BG if active else INACTIVE_BG
         
-        env = os.environ.copy()
-        env["ALACRITTY_SOCKET"] = sock
-        
-        # Use -w -1 to apply to the socket's window
-        cmd = ["alacritty", "msg", "config", "-w", "-1", f'colors.primary.background="{color}"']
-        subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # Target the window itself; one Alacritty process may host several
+        cmd = ["alacritty", "msg", "--socket", sock, "config", "-w", x11_id, f'colors.primary.background="{color}"']
+        subprocess.run(cmd, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     
     def set_initial_colors(self):
-        """Set initial colors based on current focus."""
+        """Set initial colors based on current focus, updating windows concurrently."""
         # Get the focused window's X11 ID
         focused = self.i3.get_tree().find_focused()
         focused_x11 = str(focused.window) if focused else None
         
-        self._log(f"Initial focused window: {focused_x11}")
+        self._log(f"Initial focused window: {focused_x11}", logging.DEBUG)
         
-        # Update each window
-        for x11_id in self.sockets:
-            active = (x11_id == focused_x11)
-            self.set_bg(x11_id, active)
-            status = "ACTIVE" if active else "inactive"
-            self._log(f"  Window {x11_id}: {status} -> {ACTIVE_BG if active else INACTIVE_BG}")
+        # Update every window through a bounded pool of `alacritty msg` processes
+        start = time.perf_counter()
+        jobs = [(x11_id, x11_id == focused_x11) for x11_id in self.sockets]
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(RECOLOR_WORKERS, len(jobs))) as pool:
+                list(pool.map(lambda job: self.set_bg(*job), jobs))
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if self.debug:
+            for x11_id, active in jobs:
+                status = "ACTIVE" if active else "inactive"
+                self._log(f"  Window {x11_id}: {status} -> {ACTIVE_BG if active else INACTIVE_BG}", logging.DEBUG)
+        self._log(f"Recolored {len(jobs)} windows in {elapsed:.1f} ms",
+                  windows=len(jobs), duration_ms=round(elapsed, 3))
     
     def on_focus(self, i3, e):
         """Handle window focus changes."""
         if not e.container:
             return
         
+        start = time.perf_counter()
         new_focused = str(e.container.window)
+
+        if time.monotonic() >= self.next_reconcile:
+            self.reconcile()
+        if new_focused in self.unresolved:
+            self._resolve_window(new_focused)
         
-        # Only log if focus changed to a different Alacritty window
+        previous = self.focused_x11_id
         if new_focused in self.sockets and new_focused != self.focused_x11_id:
-            self._log(f"Focus changed to Alacritty window {new_focused}")
-            
             # Set old focused window to inactive
             if self.focused_x11_id and self.focused_x11_id in self.sockets:
                 self.set_bg(self.focused_x11_id, False)
-                self._log(f"  Window {self.focused_x11_id}: inactive")
             
             # Set new focused window to active
             self.set_bg(new_focused, True)
-            self._log(f"  Window {new_focused}: active")
-            
             self.focused_x11_id = new_focused
+            message = "Focus changed to Alacritty window"
         elif new_focused not in self.sockets and self.focused_x11_id in self.sockets:
             # Focus moved away from Alacritty
             self.set_bg(self.focused_x11_id, False)
-            self._log(f"Focus moved away from Alacritty, window {self.focused_x11_id}: inactive")
             self.focused_x11_id = None
+            message = "Focus moved away from Alacritty"
+        else:
+            return
+
+        if self.debug:
+            self._log(
+                f"{message}: {previous} -> {new_focused}", logging.DEBUG,
+                window=new_focused, previous=previous,
+                duration_ms=round((time.perf_counter() - start) * 1000, 3)
+            )
     
-    def run(self):
-        """Start the event loop."""
-        # Subscribe to window focus events
-        self.i3.on("window::focus", self.on_focus)
-        
+    def start(self):
+        """Record the current focus and recolor every mapped window."""
         # Get initial focused window
         focused = self.i3.get_tree().find_focused()
         if focused:
@@ -134,15 +431,36 @@ class Manager:
         
         # Set initial state
         self.set_initial_colors()
+
+    def run(self):
+        """Start the event loop."""
+        # Subscribe to window focus events and keep the map current
+        self.i3.on("window::focus", self.on_focus)
+        self.i3.on("window::new", self.on_new)
+        self.i3.on("window::close", self.on_close)
+        
+        self.start()
         
         self._log("Listening for focus events (Ctrl+C to stop)...")
-        self._log("=" * 50)
         
         # Main event loop
         try:
             self.i3.main()
         except KeyboardInterrupt:
-            self._log("\nShutting down...")
+            self._log("Shutting down...")
 
 if __name__ == "__main__":
-    Manager().run()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log-level", default="info", choices=["debug", "info", "warning", "error"],
+                        help="debug adds per-window and per-focus-event lines")
+    parser.add_argument("--log-json", action="store_true",
+                        help="emit one JSON object per line, including event timings")
+    parser.add_argument("--scan-workers", type=int, default=0,
+                        help="threads for the /proc/*/stat fallback scan on kernels without "
+                             "task/*/children (0: scan serially)")
+    args = parser.parse_args()
+    listener = setup_logging(args.log_level, args.log_json)
+    try:
+        Manager(scan_workers=args.scan_workers).run()
+    finally:
+        listener.stop()
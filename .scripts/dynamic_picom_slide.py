@@ -1,44 +1,299 @@
 #!/usr/bin/env python3
 import i3ipc
+import os
 import re
-import subprocess
+import signal
+import sys
+import tempfile
+import threading
+import time
 
 # Set your config file path
 PICOM_CONFIG = "/home/ll931217/.config/picom.conf"
+PROC_ROOT = "/proc"
+SETTLE_SECONDS = 0.25  # at most one picom reload per settle period
+# Treat first <-> last workspace as next/prev wrap-around rather than a jump.
+# Off by default: the i3 config only jumps to workspaces by number ($mod+N),
+# where 4 -> 1 must slide back like any other jump
+WRAP_AROUND = False
 
+DIRECTION_RE = re.compile(r'(direction = ")(left|right)(";)')
 
-# Helper to read and update animation direction in picom.conf
+# Events after which workspace order or placement may have changed
+ORDER_EVENTS = ("workspace::init", "workspace::empty", "workspace::rename",
+                "workspace::move", "workspace::reload")
+
+# Last focused workspace name; seeded from get_workspaces() at startup
+previous_ws = None
+
+
+class SlideConfig:
+    """
+    picom.conf held in memory as a template around the direction slot.
+
+    The file is parsed once (and again only if its mtime changes under us),
+    written atomically only when the direction actually flips, and picom is
+    signalled directly by PID. A symlinked path (the dotfiles install) is
+    resolved so the write replaces the link's target, not the link.
+
+    request() debounces: a flip reloads picom at once unless another reload
+    happened within the settle period, in which case it is deferred to the
+    end of that period and merged with any later requests.
+    """
+
+    def __init__(self, path, proc_root=PROC_ROOT, settle=SETTLE_SECONDS):
+        self.path = os.path.realpath(path)
+        self.proc_root = proc_root
+        self.settle = settle
+        self._head = self._tail = None
+        self.direction = None
+        self._mtime_ns = None
+        self._picom_pids = []
+
+        # Debounce state: wanted direction, deferred reload timer
+        self.wanted = None
+        self._last_reload = float("-inf")
+        self._timer = None
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "reloads": 0,
+            "skipped_same_direction": 0,
+            "coalesced": 0,
+        }
+
+    @property
+    def reloads_avoided(self):
+        return self.counters["skipped_same_direction"] + self.counters["coalesced"]
+
+    def _load(self):
+        with open(self.path, "r") as f:
+            config = f.read()
+            self._mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        # Only the first direction slot is managed
+        match = DIRECTION_RE.search(config)
+        if match:
+            self._head = config[:match.end(1)]
+            self.direction = match.group(2)
+            self._tail = config[match.start(3):]
+        else:
+            self._head = self._tail = self.direction = None
+
+    def _stale(self):
+        try:
+            return os.stat(self.path).st_mtime_ns != self._mtime_ns
+        except OSError:
+            return True
+
+    def _refresh(self):
+        if self._mtime_ns is None or self._stale():
+            self._load()
+
+    def request(self, direction):
+        """Ask for a slide direction; reloads picom at most once per settle period."""
+        with self._lock:
+            self.counters["requests"] += 1
+            self.wanted = direction
+            if self._timer is not None:
+                # A deferred reload is pending and will use the latest request
+                self.counters["coalesced"] += 1
+                return
+
+            self._refresh()
+            if self.direction is None or direction == self.direction:
+                self.counters["skipped_same_direction"] += 1
+                return
+
+            wait = self._last_reload + self.settle - time.monotonic()
+            if wait <= 0:
+                self._apply(direction)
+                return
+            self._timer = threading.Timer(wait, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        with self._lock:
+            self._timer = None
+            self._refresh()
+            if self.direction is None or self.wanted == self.direction:
+                # Flipped back before the settle period ended
+                self.counters["skipped_same_direction"] += 1
+                return
+            self._apply(self.wanted)
+
+    def cancel(self):
+        """Drop a deferred reload, e.g. on shutdown."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def set_direction(self, direction):
+        """Point the slide animation left or right now; returns True if picom was reloaded."""
+        with self._lock:
+            self._refresh()
+            if self.direction is None or direction == self.direction:
+                return False
+            self._apply(direction)
+            return True
+
+    def _apply(self, direction):
+        self._write(f"{self._head}{direction}{self._tail}")
+        self.direction = direction
+        self._last_reload = time.monotonic()
+        self.counters["reloads"] += 1
+        self.reload_picom()
+
+    def format_counters(self):
+        counters = {**self.counters, "reloads_avoided": self.reloads_avoided}
+        return " ".join(f"{name}={value}" for name, value in counters.items())
+
+    def _write(self, config):
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".picom.conf.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(config)
+            os.chmod(tmp_path, os.stat(self.path).st_mode & 0o7777)
+            # Atomic: picom never sees a half-written config
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._mtime_ns = os.stat(self.path).st_mtime_ns
+
+    def _is_picom(self, pid):
+        try:
+            with open(f"{self.proc_root}/{pid}/comm") as f:
+                return f.read().strip() == "picom"
+        except OSError:
+            return False
+
+    def _find_picom(self):
+        pids = []
+        for entry in os.listdir(self.proc_root):
+            if entry.isdigit() and self._is_picom(entry):
+                pids.append(int(entry))
+        return pids
+
+    def reload_picom(self):
+        """SIGUSR1 every picom, rescanning /proc only when the cached PIDs are gone."""
+        # picom is restarted on every i3 reload, so verify the cached PIDs first
+        pids = [pid for pid in self._picom_pids if self._is_picom(pid)]
+        if not pids:
+            pids = self._find_picom()
+        self._picom_pids = []
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGUSR1)
+            except ProcessLookupError:
+                continue
+            self._picom_pids.append(pid)
+
+
+class WorkspaceOrder:
+    """
+    Slide order of every workspace, across outputs.
+
+    Outputs are ranked left to right (then top to bottom) and workspaces
+    keep i3's order within their output, so each workspace name maps to one
+    global rank. Built from get_workspaces() when workspaces appear, vanish,
+    move or are renamed; a focus switch is then a pair of dict lookups.
+    """
+
+    def __init__(self, wrap_around=WRAP_AROUND):
+        self.wrap_around = wrap_around
+        self._rank = {}  # name -> global rank
+        self._output = {}  # name -> (first rank, last rank) of its output
+
+    def refresh(self, workspaces):
+        outputs = {}
+        for ws in workspaces:
+            outputs.setdefault(ws.output, []).append(ws)
+        ordered = sorted(
+            outputs.values(),
+            key=lambda group: (min(w.rect.x for w in group), min(w.rect.y for w in group)),
+        )
+        self._rank = {}
+        self._output = {}
+        rank = 0
+        for group in ordered:
+            span = (rank, rank + len(group) - 1)
+            for ws in group:
+                self._rank[ws.name] = rank
+                self._output[ws.name] = span
+                rank += 1
+
+    def __contains__(self, name):
+        return name in self._rank
+
+    def direction(self, old, new):
+        """Slide direction for a switch: "left" forward (1 → 2), "right" back, or None."""
+        a = self._rank.get(old)
+        b = self._rank.get(new)
+        if a is None or b is None or a == b:
+            return None
+        if self.wrap_around and self._is_wrap(old, new, a, b):
+            return "left" if a > b else "right"
+        return "left" if b > a else "right"
+
+    def _is_wrap(self, old, new, a, b):
+        # Ends of the same output with others between; moves across outputs
+        # always follow the physical layout
+        first, last = self._output[old]
+        return self._output[new] == (first, last) and last - first > 1 and {a, b} == {first, last}
+
+
+slide_config = SlideConfig(PICOM_CONFIG)
+workspace_order = WorkspaceOrder()
+
+
+# Helper to update animation direction in picom.conf
 def set_slide_direction(direction):
-    with open(PICOM_CONFIG, "r") as f:
-        config = f.read()
-    # Change the direction in the animations block (left/right)
-    new_config = re.sub(
-        r'(direction = ")(left|right)(";)', f"\\1{direction}\\3", config
-    )
-    with open(PICOM_CONFIG, "w") as f:
-        f.write(new_config)
-    # Reload picom (works if started without --daemon)
-    subprocess.run(["pkill", "-SIGUSR1", "picom"])
+    # Reload picom (works if started without --daemon); repeats are skipped
+    slide_config.request(direction)
+
+
+def refresh_workspaces(i3):
+    """Rebuild the workspace order and remember the focused workspace."""
+    global previous_ws
+    ws_list = i3.get_workspaces()
+    workspace_order.refresh(ws_list)
+    focused = next((w.name for w in ws_list if w.focused), None)
+    if focused is not None:
+        previous_ws = focused
+
+
+def on_workspace_change(i3, event):
+    """Keep the workspace order current (init/empty/rename/move/reload)."""
+    # previous_ws is left alone: init arrives just before the focus event
+    workspace_order.refresh(i3.get_workspaces())
 
 
 def on_workspace(i3, event):
     global previous_ws
-    current_ws = event.current.num if event.current else None
+    current_ws = event.current.name if event.current else None
+    if current_ws is not None and current_ws not in workspace_order:
+        # Focus can arrive before or without the matching init event
+        workspace_order.refresh(i3.get_workspaces())
     if previous_ws is None or current_ws is None:
         previous_ws = current_ws
         return
-    if current_ws > previous_ws:
-        set_slide_direction("left")  # 1 → 2 → 3 slides left
-    elif current_ws < previous_ws:
-        set_slide_direction("right")  # 3 → 2 → 1 slides right
+    direction = workspace_order.direction(previous_ws, current_ws)
+    if direction:
+        set_slide_direction(direction)  # 1 → 2 → 3 slides left, 3 → 2 → 1 right
     previous_ws = current_ws
 
 
 if __name__ == "__main__":
-    previous_ws = None
     i3 = i3ipc.Connection()
-    ws_list = i3.get_workspaces()
-    if ws_list:
-        previous_ws = next((w.num for w in ws_list if w.focused), None)
+    refresh_workspaces(i3)
     i3.on("workspace::focus", on_workspace)
-    i3.main()
+    for event_name in ORDER_EVENTS:
+        i3.on(event_name, on_workspace_change)
+    signal.signal(signal.SIGUSR1, lambda *_: print(slide_config.format_counters(), file=sys.stderr, flush=True))
+    try:
+        i3.main()
+    finally:
+        slide_config.cancel()
@@ -1,27 +1,42 @@
 #!/home/ll931217/.local/share/voice-dictate-venv/bin/python
 """Voice dictation for i3wm. Toggle: press once to start, again to stop.
 
-Records audio → streams to faster-whisper in chunks → types text in real-time.
+Records audio → cuts it into utterances at pauses → streams them to
+faster-whisper → types text in real-time.
+
+Run `voice-dictate --daemon` once (e.g. from the i3 config) to keep the model
+loaded; the toggle then just sends a command to the daemon's socket.
 """
 
 from enum import Enum
 
+import argparse
+import collections
+import json
+import math
 import os
+import queue
 import sys
 import shutil
 import re
 import signal
+import socket
 import subprocess
 import tempfile
 import threading
 import time
+import traceback
 from pathlib import Path
+from typing import NamedTuple
 
-import numpy as np
-import tkinter as tk
-from faster_whisper import WhisperModel
+# Imported by _import_runtime(); the toggle client never needs them
+np = tk = WhisperModel = None
 
 PID_FILE = Path(tempfile.gettempdir()) / "voice-dictate.pid"
+SOCKET_PATH = (
+    Path(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir())
+    / "voice-dictate.sock"
+)
 MAX_DURATION = 120
 WINDOW_SIZE = 160
 
@@ -29,6 +44,36 @@ SAMPLE_RATE = 16000
 CHUNK_SECONDS = 3
 CHUNK_SAMPLES = SAMPLE_RATE * CHUNK_SECONDS
 MIN_SAMPLES = SAMPLE_RATE  # 1 second minimum to transcribe
+READ_SAMPLES = SAMPLE_RATE // 10  # 100 ms per pipe read
+AUDIO_QUEUE_CHUNKS = 4  # utterances waiting for inference before capture blocks
+TEXT_QUEUE_ITEMS = 32  # transcripts waiting to be typed before inference blocks
+
+# Utterance segmentation (energy VAD in front of the model)
+FRAME_SAMPLES = SAMPLE_RATE * 30 // 1000  # 30 ms analysis frames
+PAUSE_SECONDS = 0.5  # silence that ends an utterance
+PRE_ROLL_SECONDS = 0.2  # audio kept before the first speech frame
+POST_ROLL_SECONDS = 0.2  # silence kept after the last speech frame
+MIN_SPEECH_SECONDS = 0.25  # utterances with less speech are dropped
+MAX_UTTERANCE_SECONDS = 15  # longer speech is cut at its quietest recent frame
+MAX_UTTERANCE_SAMPLES = SAMPLE_RATE * MAX_UTTERANCE_SECONDS
+UTTERANCE_BUFFER = MAX_UTTERANCE_SAMPLES + 2 * FRAME_SAMPLES  # cap plus frame slack
+VAD_MARGIN_DB = 12  # speech must be this far above the noise floor
+VAD_MIN_DB = -55  # and never quieter than this
+# The first noise floor is a low percentile of the opening frames, capped at
+# quiet-room level so speech already under way is never taken for noise
+CALIBRATION_FRAMES = 10  # 300 ms
+VAD_QUIET_DB = -45
+
+# Highest real-time factor (inference time / audio time) allowed when picking
+# a model from benchmark results. Utterances vary in length (up to
+# MAX_UTTERANCE_SECONDS), so the budget scales with them: at 0.33 a 3 s
+# utterance is typed ~1 s after it ends and the longest one ~5 s after.
+RTF_BUDGET = 0.33
+RTF_CACHE = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "voice-dictate"
+    / "rtf.json"
+)
 
 BG = "#1e1e2e"
 ACCENT = "#89b4fa"
@@ -38,6 +83,13 @@ TEXT_COLOR = "#cdd6f4"
 _model = None
 
 
+def _import_runtime():
+    global np, tk, WhisperModel
+    import numpy as np
+    import tkinter as tk
+    from faster_whisper import WhisperModel
+
+
 class ModelSizes(str, Enum):
     tiny = "tiny"
     tiny_en = "tiny.en"
@@ -59,12 +111,117 @@ class ModelSizes(str, Enum):
     turbo = "turbo"
 
 
+# Preferred compute types per device, fastest first
+COMPUTE_TYPES = {
+    "cuda": ("int8_float16", "float16", "int8", "float32"),
+    "cpu": ("int8", "int8_float32", "float32"),
+}
+
+# English models from cheapest to most accurate, for budget-based selection
+MODEL_LADDER = (
+    ModelSizes.tiny_en,
+    ModelSizes.base_en,
+    ModelSizes.small_en,
+    ModelSizes.medium_en,
+    ModelSizes.distil_large_v3,
+    ModelSizes.large_v3_turbo,
+)
+
+# Used when there are no benchmark results for the backend
+DEFAULT_MODELS = {"cuda": ModelSizes.small_en, "cpu": ModelSizes.base_en}
+
+
+class Backend(NamedTuple):
+    device: str
+    compute_type: str
+    cpu_threads: int
+    num_workers: int
+
+    @property
+    def key(self):
+        return f"{self.device}/{self.compute_type}"
+
+
+def probe_backend(device=None):
+    """Pick device, compute type and thread counts for this machine.
+
+    CUDA is used when ctranslate2 sees a GPU, CPU otherwise. One
+    transcription runs at a time, so a single worker gets every core.
+    """
+    import ctranslate2
+
+    if device is None:
+        try:
+            device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        except RuntimeError:
+            device = "cpu"
+    supported = ctranslate2.get_supported_compute_types(device)
+    compute_type = next(
+        (c for c in COMPUTE_TYPES[device] if c in supported), "default"
+    )
+    return Backend(
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=len(os.sched_getaffinity(0)),
+        num_workers=1,
+    )
+
+
+def load_rtf_cache():
+    try:
+        return json.loads(RTF_CACHE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def pick_model(backend, budget=RTF_BUDGET):
+    """Most accurate benchmarked model whose real-time factor fits the budget."""
+    measured = load_rtf_cache().get(backend.key, {})
+    candidates = [size for size in MODEL_LADDER if size.value in measured]
+    if not candidates:
+        return DEFAULT_MODELS[backend.device]
+    fitting = [s for s in candidates if measured[s.value] <= budget]
+    # Nothing fits: the fastest measured model is the closest
+    return fitting[-1] if fitting else min(candidates, key=lambda s: measured[s.value])
+
+
+def _create_model(size, backend):
+    model = WhisperModel(
+        size,
+        device=backend.device,
+        compute_type=backend.compute_type,
+        cpu_threads=backend.cpu_threads,
+        num_workers=backend.num_workers,
+    )
+    if backend.device == "cuda":
+        # Missing CUDA libraries only fail on first use; find out now
+        _warm_up(model)
+    return model
+
+
+def _warm_up(model):
+    segments, _ = model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    list(segments)
+
+
 def load_model():
+    """Load the model on the best working backend.
+
+    VOICE_DICTATE_DEVICE (cuda/cpu) and VOICE_DICTATE_MODEL override the
+    probed device and the budget-based model choice.
+    """
     global _model
     if _model is None:
-        _model = WhisperModel(
-            ModelSizes.small_en, device="cuda", compute_type="int8_float16"
-        )
+        backend = probe_backend(os.environ.get("VOICE_DICTATE_DEVICE"))
+        size = os.environ.get("VOICE_DICTATE_MODEL") or pick_model(backend)
+        try:
+            _model = _create_model(size, backend)
+        except (RuntimeError, ValueError):
+            if backend.device == "cpu":
+                raise
+            backend = probe_backend("cpu")
+            size = os.environ.get("VOICE_DICTATE_MODEL") or pick_model(backend)
+            _model = _create_model(size, backend)
     return _model
 
 
@@ -139,32 +296,529 @@ def start_ffmpeg():
     )
 
 
-def stream_transcribe(ffmpeg_proc, window_id, stop_event):
+class AudioRing:
+    """Preallocated float32 sample buffer filled straight from a PCM pipe.
+
+    Each read lands in a reused int16 block via readinto() and is converted
+    in place into the float buffer, so steady-state reads allocate nothing.
+    take() returns views, valid until the next fill(). When the write end
+    nears capacity the unread tail is moved back to the start; capacity must
+    be at least 3x (largest take + read size) so that move never overlaps.
+    """
+
+    def __init__(self, capacity, read_samples=READ_SAMPLES):
+        self._data = np.empty(capacity, dtype=np.float32)
+        self._raw = np.empty(read_samples, dtype=np.int16)
+        self._raw_bytes = memoryview(self._raw).cast("B")
+        self._scale = np.float32(1 / 32768)
+        self._start = 0  # first unread sample
+        self._end = 0  # one past the last written sample
+
+    def __len__(self):
+        return self._end - self._start
+
+    def fill(self, stream):
+        """Read one block from a binary stream; returns samples added, 0 at EOF."""
+        if self._end + len(self._raw) > len(self._data):
+            self._compact()
+        samples = (stream.readinto(self._raw_bytes) or 0) // 2
+        out = self._data[self._end:self._end + samples]
+        np.copyto(out, self._raw[:samples])
+        np.multiply(out, self._scale, out=out)
+        self._end += samples
+        return samples
+
+    def take(self, count):
+        """Consume count samples and return them as a view."""
+        view = self._data[self._start:self._start + count]
+        self._start += len(view)
+        return view
+
+    def peek(self, offset, count):
+        """View count unread samples starting offset samples in, without consuming."""
+        start = self._start + offset
+        return self._data[start:start + count]
+
+    def skip(self, count):
+        """Discard up to count unread samples."""
+        self._start += min(count, len(self))
+
+    def _compact(self):
+        unread = len(self)
+        self._data[:unread] = self._data[self._start:self._end]
+        self._start, self._end = 0, unread
+
+
+class EnergySegmenter:
+    """Cuts the audio in an AudioRing into utterances at natural pauses.
+
+    Frames louder than an adaptive noise floor count as speech; the floor
+    starts from the first CALIBRATION_FRAMES and adapts from there. An utterance
+    starts PRE_ROLL_SECONDS before the first speech frame and ends
+    POST_ROLL_SECONDS into a pause of PAUSE_SECONDS; speech running past
+    MAX_UTTERANCE_SECONDS is cut at the quietest frame of its last second.
+    Silence between utterances is discarded without reaching the model.
+    """
+
+    def __init__(self):
+        self.frame = FRAME_SAMPLES
+        self.pause = int(PAUSE_SECONDS * SAMPLE_RATE)
+        self.pre_roll = int(PRE_ROLL_SECONDS * SAMPLE_RATE)
+        self.post_roll = int(POST_ROLL_SECONDS * SAMPLE_RATE)
+        self.min_speech = int(MIN_SPEECH_SECONDS * SAMPLE_RATE)
+        self.max_len = MAX_UTTERANCE_SAMPLES
+        self._floor = None  # noise floor in dB
+        self._calibration = []  # energies of the opening frames
+        # Positions are sample offsets from the ring's read position
+        self._pos = 0  # samples already classified
+        self._start = None  # start of the current utterance
+        self._silence = 0  # trailing silent samples in the utterance
+        self._voiced = 0  # speech samples in the utterance
+        self._recent = collections.deque(maxlen=SAMPLE_RATE // FRAME_SAMPLES)
+        self.utterances = 0
+        self.skipped = 0  # samples never sent to the model
+        self.forced_cuts = 0
+        self.consumed = 0  # samples taken or skipped from the ring so far
+
+    def is_speech(self, frame):
+        """Classify one frame and update the noise floor."""
+        energy = 10 * math.log10(float(np.dot(frame, frame)) / len(frame) + 1e-10)
+        if len(self._calibration) < CALIBRATION_FRAMES:
+            self._calibration.append(energy)
+            self._floor = min(float(np.percentile(self._calibration, 10)), VAD_QUIET_DB)
+        elif energy < self._floor:
+            self._floor += 0.1 * (energy - self._floor)  # follow quiet quickly
+        else:
+            self._floor += 0.001 * (energy - self._floor)  # creep up over ~30 s
+        return energy, energy > max(self._floor + VAD_MARGIN_DB, VAD_MIN_DB)
+
+    def next_utterance(self, ring, final=False):
+        """
+        Return the next complete utterance as a view into the ring, or None.
+
+        With final=True, speech still in progress is returned as well.
+        """
+        while self._pos + self.frame <= len(ring):
+            energy, speech = self.is_speech(ring.peek(self._pos, self.frame))
+            self._pos += self.frame
+
+            if self._start is None:
+                if speech:
+                    self._start = max(0, self._pos - self.frame - self.pre_roll)
+                    self._voiced = self.frame
+                    self._silence = 0
+                elif self._pos > self.pre_roll:
+                    drop = self._pos - self.pre_roll
+                    ring.skip(drop)
+                    self._pos -= drop
+                    self.skipped += drop
+                    self.consumed += drop
+                continue
+
+            self._recent.append((self._pos, energy))
+            if speech:
+                self._voiced += self.frame
+                self._silence = 0
+            else:
+                self._silence += self.frame
+
+            if self._silence >= self.pause:
+                utterance = self._emit(ring, self._pos - self._silence + self.post_roll)
+            elif self._pos - self._start >= self.max_len:
+                # Cut where a word boundary is most likely, and keep going
+                self.forced_cuts += 1
+                end = min(self._recent, key=lambda item: item[1])[0]
+                utterance = self._emit(ring, end, in_speech=True)
+            else:
+                continue
+            if utterance is not None:
+                return utterance
+
+        if final and self._start is not None:
+            return self._emit(ring, len(ring))
+        return None
+
+    def _emit(self, ring, end, in_speech=False):
+        start, voiced = self._start, self._voiced
+        ring.skip(start)
+        utterance = ring.take(end - start)
+        self.consumed += end
+        self._pos -= end
+        self._recent.clear()
+        self._silence = 0
+        if in_speech:
+            self._start, self._voiced = 0, self._pos
+        else:
+            self._start, self._voiced = None, 0
+        if voiced < self.min_speech:
+            self.skipped += start + len(utterance)
+            return None
+        self.skipped += start
+        self.utterances += 1
+        return utterance
+
+    def summary(self):
+        return {
+            "utterances": self.utterances,
+            "silence_skipped_s": round(self.skipped / SAMPLE_RATE, 1),
+            "forced_cuts": self.forced_cuts,
+        }
+
+
+class StageStats:
+    """Latency and queue depth of one pipeline stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.busy = 0.0  # seconds spent working
+        self.max_busy = 0.0
+        self.waited = 0.0  # seconds items sat in the stage's input queue
+        self.max_depth = 0
+
+    def record(self, busy, waited, depth):
+        self.count += 1
+        self.busy += busy
+        self.max_busy = max(self.max_busy, busy)
+        self.waited += waited
+        self.max_depth = max(self.max_depth, depth)
+
+    def summary(self):
+        n = self.count or 1
+        return {
+            "count": self.count,
+            "mean_ms": round(self.busy / n * 1000, 1),
+            "max_ms": round(self.max_busy * 1000, 1),
+            "mean_wait_ms": round(self.waited / n * 1000, 1),
+            "max_depth": self.max_depth,
+        }
+
+
+def stream_transcribe(ffmpeg_proc, window_id, stop_event, session_stats):
+    """Capture, transcribe and type in three stages joined by bounded queues.
+
+    Capture (this thread) segments the audio into utterances and copies each
+    into a pooled buffer for the inference thread, which hands text to the
+    output thread. Typing a long
+    sentence therefore never holds up the next chunk's transcription, and a
+    backlog blocks the stage feeding it instead of growing without bound.
+
+    Returns once every queued utterance has been typed; the session's stats
+    are then stored in the session_stats dict.
+    """
     model = load_model()
-    buffer = np.array([], dtype=np.float32)
+    ring = AudioRing(3 * (UTTERANCE_BUFFER + READ_SAMPLES))
+    segmenter = EnergySegmenter()
+
+    # Utterance buffers: queued ones plus one in inference and one being filled
+    pool = queue.Queue()
+    for _ in range(AUDIO_QUEUE_CHUNKS + 2):
+        pool.put(np.empty(UTTERANCE_BUFFER, dtype=np.float32))
+    audio_q = queue.Queue(maxsize=AUDIO_QUEUE_CHUNKS)
+    text_q = queue.Queue(maxsize=TEXT_QUEUE_ITEMS)
+    stats = {stage: StageStats() for stage in ("capture", "inference", "output")}
+    end_to_end = StageStats()
+
+    def infer():
+        while (item := audio_q.get()) is not None:
+            buf, count, captured = item
+            start = time.perf_counter()
+            try:
+                text = _transcribe(model, buf[:count])
+            except Exception:
+                # Lose this chunk, not the session
+                traceback.print_exc()
+                text = ""
+            finally:
+                pool.put(buf)
+            done = time.perf_counter()
+            stats["inference"].record(done - start, start - captured, audio_q.qsize())
+            if text:
+                text_q.put((text, captured, done))
+        text_q.put(None)
+
+    def output():
+        while (item := text_q.get()) is not None:
+            text, captured, queued = item
+            start = time.perf_counter()
+            try:
+                type_text(" " + text, window_id)
+            except Exception:
+                # Lose this text, not the session: the stage must reach its sentinel
+                traceback.print_exc()
+            done = time.perf_counter()
+            stats["output"].record(done - start, start - queued, text_q.qsize())
+            end_to_end.record(done - captured, 0.0, 0)
+
+    def submit(audio):
+        start = time.perf_counter()
+        buf = pool.get()
+        np.copyto(buf[:len(audio)], audio)
+        audio_q.put((buf, len(audio), start))
+        stats["capture"].record(time.perf_counter() - start, 0.0, audio_q.qsize())
+
+    workers = [threading.Thread(target=infer, daemon=True),
+               threading.Thread(target=output, daemon=True)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        while not stop_event.is_set():
+            if not ring.fill(ffmpeg_proc.stdout):
+                break
+
+            while (utterance := segmenter.next_utterance(ring)) is not None:
+                submit(utterance)
+
+        # Flush speech still in progress
+        while (utterance := segmenter.next_utterance(ring, final=True)) is not None:
+            submit(utterance)
+    finally:
+        audio_q.put(None)
+        for worker in workers:
+            worker.join()
+
+    session_stats.update({name: stage.summary() for name, stage in stats.items()})
+    session_stats["end_to_end"] = end_to_end.summary()
+    session_stats["segmenter"] = segmenter.summary()
+    print(format_stats(session_stats), file=sys.stderr, flush=True)
+
+
+def format_stats(session_stats):
+    lines = [f"{'stage':<12}{'count':>6}{'mean ms':>9}{'max ms':>9}{'wait ms':>9}{'depth':>7}"]
+    for name, s in session_stats.items():
+        if name == "segmenter":
+            continue
+        lines.append(f"{name:<12}{s['count']:>6}{s['mean_ms']:>9.1f}{s['max_ms']:>9.1f}"
+                     f"{s['mean_wait_ms']:>9.1f}{s['max_depth']:>7}")
+    if "segmenter" in session_stats:
+        lines.append(" ".join(f"{k}={v}" for k, v in session_stats["segmenter"].items()))
+    return "\n".join(lines)
+
+
+def _transcribe(model, audio):
+    segments, _ = model.transcribe(audio, beam_size=3, vad_filter=True)
+    return "".join(seg.text for seg in segments).strip()
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
 
-    while not stop_event.is_set():
-        raw = ffmpeg_proc.stdout.read(CHUNK_SAMPLES * 2)
+
+def load_audio(path):
+    """Decode any audio file to 16 kHz mono float32 with ffmpeg."""
+    raw = subprocess.run(
+        ["ffmpeg", "-loglevel", "quiet", "-i", str(path), "-ac", "1",
+         "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+        capture_output=True,
+        check=True,
+    ).stdout
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def benchmark(sizes, audio, backend):
+    """Print the real-time factor of each model and cache it for pick_model().
+
+    RTF is inference time divided by audio duration; RTF times an
+    utterance's length is the delay before its text appears.
+    """
+    duration = len(audio) / SAMPLE_RATE
+    cache = load_rtf_cache()
+    results = cache.setdefault(backend.key, {})
+    print(f"{backend.device} {backend.compute_type}, {backend.cpu_threads} threads, "
+          f"{duration:.1f}s of audio, budget rtf {RTF_BUDGET:.2f}")
+    print(f"{'model':<20}{'load s':>8}{'rtf':>8}{f'{MAX_UTTERANCE_SECONDS}s utt s':>12}")
+    for size in sizes:
+        start = time.perf_counter()
+        try:
+            model = _create_model(size, backend)
+        except (RuntimeError, ValueError) as e:
+            print(f"{size.value:<20}  failed: {e}")
+            continue
+        loaded = time.perf_counter() - start
+        if backend.device == "cpu":
+            _warm_up(model)
+
+        start = time.perf_counter()
+        segments, _ = model.transcribe(audio, beam_size=3, vad_filter=False)
+        list(segments)  # transcription is lazy
+        rtf = (time.perf_counter() - start) / duration
+        results[size.value] = round(rtf, 4)
+        fits = "" if rtf <= RTF_BUDGET else "  over budget"
+        print(f"{size.value:<20}{loaded:>8.2f}{rtf:>8.3f}{rtf * MAX_UTTERANCE_SECONDS:>12.2f}{fits}")
+        del model
+
+    RTF_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    RTF_CACHE.write_text(json.dumps(cache, indent=2))
+    print(f"picked for this backend: {pick_model(backend).value} (results in {RTF_CACHE})")
+
+
+def cmd_benchmark(args):
+    backend = probe_backend(args.device)
+    if args.audio:
+        audio = load_audio(args.audio)
+    else:
+        # Noise stands in for speech; timing, not text, is what counts here
+        rng = np.random.default_rng(0)
+        audio = rng.normal(0, 0.05, SAMPLE_RATE * args.seconds).astype(np.float32)
+    sizes = [ModelSizes(m) for m in args.models] if args.models else list(ModelSizes)
+    benchmark(sizes, audio, backend)
+
+
+def _concat_chunks(stream):
+    """The pre-AudioRing buffering loop, kept as the allocation baseline."""
+    buffer = np.array([], dtype=np.float32)
+    while True:
+        raw = stream.read(CHUNK_SAMPLES * 2)
         if not raw:
             break
         samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
         buffer = np.concatenate([buffer, samples])
-
         while len(buffer) >= CHUNK_SAMPLES:
-            chunk = buffer[:CHUNK_SAMPLES]
+            yield buffer[:CHUNK_SAMPLES]
             buffer = buffer[CHUNK_SAMPLES:]
-            _transcribe_chunk(model, chunk, window_id)
 
-    # Flush remaining audio
-    if len(buffer) >= MIN_SAMPLES:
-        _transcribe_chunk(model, buffer, window_id)
 
+def _ring_chunks(stream, ring):
+    while ring.fill(stream):
+        while len(ring) >= CHUNK_SAMPLES:
+            yield ring.take(CHUNK_SAMPLES)
 
-def _transcribe_chunk(model, audio, window_id):
-    segments, _ = model.transcribe(audio, beam_size=3, vad_filter=True)
-    text = "".join(seg.text for seg in segments).strip()
-    if text:
-        type_text(" " + text, window_id)
+
+def benchmark_buffer(seconds):
+    """Compare the memory allocated by the two buffering loops.
+
+    numpy reports its buffers to tracemalloc. The peak is reset around every
+    chunk, so each chunk's peak over the live baseline is a lower bound on
+    what producing it allocated. Python cannot count individual numpy
+    allocations without a C-level hook, so bytes stand in for counts.
+    """
+    import io
+    import tracemalloc
+
+    pcm = np.random.default_rng(0).integers(
+        -3000, 3000, SAMPLE_RATE * seconds, dtype=np.int16
+    ).tobytes()
+
+    print(f"{seconds}s of 16 kHz audio, {CHUNK_SECONDS}s chunks")
+    print(f"{'buffer':<10}{'KiB/audio s':>14}{'max KiB/chunk':>16}{'ms/audio s':>12}")
+    # The ring is allocated once per session, outside the measured loop
+    ring = AudioRing(3 * (CHUNK_SAMPLES + READ_SAMPLES))
+    loops = (
+        ("concat", _concat_chunks),
+        ("ring", lambda stream: _ring_chunks(stream, ring)),
+    )
+    for name, chunks in loops:
+        stream = io.BytesIO(pcm)
+        tracemalloc.start()
+        allocated = largest = 0
+        start = time.perf_counter()
+        iterator = chunks(stream)
+        while True:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            chunk = next(iterator, None)
+            grown = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+            allocated += grown
+            largest = max(largest, grown)
+            if chunk is None:
+                break
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+        print(f"{name:<10}{allocated / 1024 / seconds:>14.1f}{largest / 1024:>16.1f}"
+              f"{elapsed * 1000 / seconds:>12.3f}")
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _word_errors(hypothesis, reference):
+    """Word-level edit distance (substitutions + insertions + deletions)."""
+    previous = list(range(len(reference) + 1))
+    for i, word in enumerate(hypothesis, 1):
+        current = [i]
+        for j, ref in enumerate(reference, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (word != ref)))
+        previous = current
+    return previous[-1]
+
+
+def _fixed_segments(audio):
+    segments = [audio[i:i + CHUNK_SAMPLES] for i in range(0, len(audio), CHUNK_SAMPLES)]
+    return [seg for seg in segments if len(seg) >= MIN_SAMPLES]
+
+
+def _vad_segments(audio):
+    import io
+
+    pcm = (audio * 32768).clip(-32768, 32767).astype(np.int16).tobytes()
+    stream = io.BytesIO(pcm)
+    ring = AudioRing(3 * (UTTERANCE_BUFFER + READ_SAMPLES))
+    segmenter = EnergySegmenter()
+    segments = []
+    cuts = set()  # utterance starts and ends, in samples from the start of the audio
+
+    def add(utterance):
+        segments.append(utterance.copy())
+        cuts.update((segmenter.consumed - len(utterance), segmenter.consumed))
+
+    while ring.fill(stream):
+        while (utterance := segmenter.next_utterance(ring)) is not None:
+            add(utterance)
+    while (utterance := segmenter.next_utterance(ring, final=True)) is not None:
+        add(utterance)
+    return segments, sorted(cuts)
+
+
+def _cuts_in_speech(audio, cuts):
+    """Cuts whose frames on both sides are speech, i.e. likely mid-word."""
+    segmenter = EnergySegmenter()
+    speech = [
+        segmenter.is_speech(audio[i:i + FRAME_SAMPLES])[1]
+        for i in range(0, len(audio) - FRAME_SAMPLES + 1, FRAME_SAMPLES)
+    ]
+    count = 0
+    for cut in cuts:
+        frame = cut // FRAME_SAMPLES
+        if 0 < frame < len(speech) and speech[frame - 1] and speech[frame]:
+            count += 1
+    return count
+
+
+def benchmark_vad(path):
+    """Compare fixed CHUNK_SECONDS chunks with VAD utterances on recorded speech.
+
+    Reports inference time, audio actually transcribed, cuts that land inside
+    speech, and word errors against a transcript of the whole file in one
+    pass (which has no chunk boundaries to split words on).
+    """
+    audio = load_audio(path)
+    duration = len(audio) / SAMPLE_RATE
+    model = load_model()
+    reference = _words(_transcribe(model, audio))
+
+    fixed = _fixed_segments(audio)
+    fixed_cuts = _cuts_in_speech(audio, range(CHUNK_SAMPLES, len(audio), CHUNK_SAMPLES))
+    vad, vad_cuts = _vad_segments(audio)
+
+    print(f"{path}: {duration:.1f}s, {len(reference)} words in the whole-file transcript")
+    print(f"{'segmenter':<12}{'segments':>9}{'audio s':>9}{'infer s':>9}"
+          f"{'cuts in speech':>16}{'word errors':>13}")
+    results = {}
+    for name, segments, cuts in (("fixed", fixed, fixed_cuts),
+                                 ("vad", vad, _cuts_in_speech(audio, vad_cuts))):
+        start = time.perf_counter()
+        text = " ".join(_transcribe(model, seg) for seg in segments)
+        elapsed = time.perf_counter() - start
+        errors = _word_errors(_words(text), reference)
+        results[name] = (elapsed, cuts, errors)
+        print(f"{name:<12}{len(segments):>9}{sum(map(len, segments)) / SAMPLE_RATE:>9.1f}"
+              f"{elapsed:>9.2f}{cuts:>16}{errors:>13}")
+
+    saved = results["fixed"][0] - results["vad"][0]
+    print(f"inference time saved: {saved:.2f}s ({saved / max(results['fixed'][0], 1e-9):.0%}); "
+          f"mid-speech cuts avoided: {results['fixed'][1] - results['vad'][1]}; "
+          f"word errors avoided: {results['fixed'][2] - results['vad'][2]}")
 
 
 # ── UI ───────────────────────────────────────────────────────────────────────
@@ -312,25 +966,122 @@ class RecordingWindow:
             pass
 
 
-# ── Main ─────────────────────────────────────────────────────────────────────
+# ── Daemon ───────────────────────────────────────────────────────────────────
 
 
-def main():
-    require("ffmpeg")
-    require("xdotool")
+def send_command(command, timeout=2.0):
+    """Send one command to a running daemon; returns its reply, or None if none runs."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(SOCKET_PATH))
+            sock.sendall(command.encode() + b"\n")
+            return sock.makefile().readline().strip()
+    except OSError:
+        # No socket, stale socket, or a daemon that stopped answering
+        return None
+
+
+class DictationServer:
+    """Keeps the model loaded and runs a recording session per start command.
+
+    Commands (one line per connection): toggle, start, stop, status, stats,
+    quit. stats replies with the last session's pipeline stats as JSON.
+    Sessions run on the main thread, which Tk requires.
+
+    States: idle, recording, and finishing while a stopped session still
+    transcribes and types its queued utterances. A new session starts only
+    once the previous one has finished.
+    """
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self.state = "idle"
+        self.last_stats = {}  # pipeline stats of the last finished session
+        # Reentrant: the SIGTERM handler may run while the main thread holds it
+        self._lock = threading.RLock()
+        self._starts = queue.Queue()
+        self._stop_requested = threading.Event()
+
+    def handle(self, command):
+        with self._lock:
+            if command == "status":
+                return self.state
+            if command == "stats":
+                return json.dumps(self.last_stats)
+            if command == "toggle":
+                command = "stop" if self.state == "recording" else "start"
+            if command == "start":
+                if self.state == "idle":
+                    self.state = "recording"
+                    self._stop_requested.clear()
+                    self._starts.put(True)
+                return self.state
+            if command == "stop":
+                self._stop_requested.set()
+                return "stopping" if self.state == "recording" else self.state
+            if command == "quit":
+                self._stop_requested.set()
+                self._starts.put(False)
+                return "quitting"
+        return f"error: unknown command {command!r}"
+
+    def _finishing(self):
+        with self._lock:
+            self.state = "finishing"
+
+    def _serve(self, server):
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(2.0)
+                    command = conn.makefile().readline().strip()
+                    conn.sendall(self.handle(command).encode() + b"\n")
+                except OSError:
+                    pass
 
-    # Toggle: signal existing instance to stop
-    if PID_FILE.exists():
+    def run(self):
+        if send_command("status") is not None:
+            notify("Dictation daemon already running")
+            sys.exit(1)
+        self.path.unlink(missing_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.path))
+        os.chmod(self.path, 0o600)
+        server.listen(4)
+        signal.signal(signal.SIGTERM, lambda *_: self.handle("quit"))
+        threading.Thread(target=self._serve, args=(server,), daemon=True).start()
         try:
-            pid = int(PID_FILE.read_text().strip())
-            os.kill(pid, signal.SIGUSR1)
-        except (ProcessLookupError, ValueError, PermissionError):
-            PID_FILE.unlink(missing_ok=True)
-        sys.exit(0)
+            while self._starts.get():
+                try:
+                    self.last_stats = record(self._stop_requested, self._finishing)
+                finally:
+                    with self._lock:
+                        self.state = "idle"
+        finally:
+            server.close()
+            self.path.unlink(missing_ok=True)
 
-    PID_FILE.write_text(str(os.getpid()))
 
+# ── Main ─────────────────────────────────────────────────────────────────────
+
+
+def record(stop_requested, on_finishing=None):
+    """
+    One dictation session: record, transcribe and type until stop_requested is set.
+
+    on_finishing is called once recording stops; the call then waits for
+    the pipeline to type everything still queued.
+
+    Returns:
+        The session's pipeline stats (see format_stats)
+    """
     active_win = get_active_window()
+    session_stats = {}
 
     # Start ffmpeg piping raw PCM to stdout
     ffmpeg_proc = start_ffmpeg()
@@ -339,24 +1090,17 @@ def main():
     stop_event = threading.Event()
     transcriber = threading.Thread(
         target=stream_transcribe,
-        args=(ffmpeg_proc, active_win, stop_event),
+        args=(ffmpeg_proc, active_win, stop_event, session_stats),
         daemon=True,
     )
     transcriber.start()
 
     # Show recording window (main thread, blocks until stopped)
-    stop_flag = [False]
-    start_time = [time.time()]
-
-    def on_signal(signum, frame):
-        stop_flag[0] = True
-
-    signal.signal(signal.SIGUSR1, on_signal)
-
+    start_time = time.time()
     win = RecordingWindow()
 
     def poll():
-        if stop_flag[0] or time.time() - start_time[0] > MAX_DURATION:
+        if stop_requested.is_set() or time.time() - start_time > MAX_DURATION:
             win.stop()
             return
         win.root.after(100, poll)
@@ -365,6 +1109,8 @@ def main():
     win.run()
 
     # Stop everything
+    if on_finishing:
+        on_finishing()
     stop_event.set()
     ffmpeg_proc.terminate()
     try:
@@ -372,7 +1118,84 @@ def main():
     except subprocess.TimeoutExpired:
         ffmpeg_proc.kill()
 
-    transcriber.join(timeout=10)
+    # Up to AUDIO_QUEUE_CHUNKS utterances and TEXT_QUEUE_ITEMS texts may
+    # still be queued; returning early would drop them or overlap sessions
+    transcriber.join()
+    return session_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep the model loaded and take commands on " + str(SOCKET_PATH))
+    parser.add_argument("--command", choices=["toggle", "start", "stop", "status", "stats", "quit"],
+                        help="send a command to the daemon and print its reply")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="measure the real-time factor of each model and exit")
+    parser.add_argument("--models", nargs="+", choices=[m.value for m in ModelSizes],
+                        help="models to benchmark (default: all)")
+    parser.add_argument("--audio", type=Path,
+                        help="audio file to benchmark --benchmark with (default: generated noise)")
+    parser.add_argument("--benchmark-buffer", action="store_true",
+                        help="compare allocations of the audio buffering loops and exit")
+    parser.add_argument("--benchmark-vad", type=Path, metavar="AUDIO",
+                        help="compare fixed chunks with VAD utterances on a recording of speech and exit")
+    parser.add_argument("--seconds", type=int, default=30,
+                        help="length of the generated benchmark audio")
+    parser.add_argument("--device", choices=["cuda", "cpu"],
+                        help="benchmark on this device instead of the probed one")
+    args = parser.parse_args()
+
+    if args.command:
+        reply = send_command(args.command)
+        print(reply if reply is not None else "not running")
+        sys.exit(0 if reply is not None else 1)
+
+    toggle = not (args.daemon or args.benchmark or args.benchmark_buffer or args.benchmark_vad)
+
+    # Thin client: a running daemon does the work with its warm model
+    if toggle and send_command("toggle") is not None:
+        return
+
+    # Toggle: signal existing instance to stop
+    if toggle and PID_FILE.exists():
+        try:
+            pid = int(PID_FILE.read_text().strip())
+            os.kill(pid, signal.SIGUSR1)
+        except (ProcessLookupError, ValueError, PermissionError):
+            PID_FILE.unlink(missing_ok=True)
+        sys.exit(0)
+
+    _import_runtime()
+
+    if args.benchmark_buffer:
+        benchmark_buffer(args.seconds)
+        return
+
+    if args.benchmark_vad:
+        require("ffmpeg")
+        benchmark_vad(args.benchmark_vad)
+        return
+
+    if args.benchmark:
+        require("ffmpeg")
+        cmd_benchmark(args)
+        return
+
+    require("ffmpeg")
+    require("xdotool")
+
+    if args.daemon:
+        load_model()
+        DictationServer().run()
+        return
+
+    PID_FILE.write_text(str(os.getpid()))
+
+    stop_requested = threading.Event()
+    signal.signal(signal.SIGUSR1, lambda signum, frame: stop_requested.set())
+
+    record(stop_requested)
     PID_FILE.unlink(missing_ok=True)
 
 
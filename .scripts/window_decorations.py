@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Single-process host for the i3 window decoration daemons.
+
+Runs alacritty-focus-highlight, alacritty_bg_event and dynamic_picom_slide as
+plugins of one process with one i3 IPC connection. Each i3 event is parsed
+once and routed to the plugins subscribed to it. Plugins with blocking
+handlers run them in order on their own worker thread so they never stall
+the event loop or each other.
+
+focus-highlight and bg-event cannot be hosted together: both set
+colors.primary.background of the same Alacritty windows on every focus
+change, from different color rules. They are the only plugins whose caches
+overlap (window -> PID, PID -> socket), so no cache is shared between plugins.
+"""
+
+import abc
+import argparse
+import asyncio
+import signal
+import sys
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import i3ipc
+from i3ipc.aio import Connection
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+FOCUS_HIGHLIGHT_DIR = SCRIPTS_DIR / "alacritty-focus-highlight"
+
+
+class SyncI3:
+    """Blocking view of the host's i3ipc.aio connection for worker threads."""
+
+    def __init__(self, i3: Connection, loop: asyncio.AbstractEventLoop):
+        self._i3 = i3
+        self._loop = loop
+
+    def _call(self, coro):
+        # Never call from the event loop thread: it would wait on itself
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def get_tree(self):
+        return self._call(self._i3.get_tree())
+
+    def get_workspaces(self):
+        return self._call(self._i3.get_workspaces())
+
+
+class Plugin(abc.ABC):
+    """A set of handlers hosted by WindowDecorations."""
+
+    name = ""
+    # Events handled, e.g. "window::focus" or "workspace::focus"
+    events: tuple[str, ...] = ()
+
+    async def start(self, host: "WindowDecorations"):
+        """Prepare state and apply the initial decorations."""
+
+    @abc.abstractmethod
+    def dispatch(self, event_name: str, event):
+        """Handle one event; must not block the event loop."""
+
+    async def stop(self):
+        """Release resources while the event loop is still running."""
+
+    def close(self):
+        """Release resources after the event loop has finished."""
+
+
+class ThreadedPlugin(Plugin):
+    """Runs blocking handlers in arrival order on a dedicated worker thread."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.name)
+
+    async def start(self, host: "WindowDecorations"):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.setup, host.sync_i3)
+
+    def setup(self, i3: SyncI3):
+        """Blocking part of start(), run on the worker thread."""
+
+    def dispatch(self, event_name: str, event):
+        future = self._executor.submit(self.handle, event_name, event)
+        future.add_done_callback(self._report_error)
+
+    @abc.abstractmethod
+    def handle(self, event_name: str, event):
+        """Blocking event handler, run on the worker thread."""
+
+    def _report_error(self, future: Future):
+        error = future.exception()
+        if error is not None:
+            print(f"{self.name}: handler failed", file=sys.stderr)
+            traceback.print_exception(error)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class FocusHighlightPlugin(Plugin):
+    """AlacrittyFocusHighlight; already asyncio-based, so it runs on the loop."""
+
+    name = "focus-highlight"
+    events = ("window::focus", "window::close")
+
+    def __init__(self, config_path: Path):
+        sys.path.insert(0, str(FOCUS_HIGHLIGHT_DIR))
+        from alacritty_focus_highlight import AlacrittyFocusHighlight
+        self.daemon = AlacrittyFocusHighlight(config_path)
+        self._i3 = None
+
+    async def start(self, host: "WindowDecorations"):
+        self._i3 = host.i3
+        await self.daemon.start(host.i3)
+
+    def dispatch(self, event_name: str, event):
+        if event_name == "window::focus":
+            self.daemon.on_window_focus(self._i3, event)
+        else:
+            self.daemon.on_window_close(self._i3, event)
+
+    async def stop(self):
+        self.daemon.stop()
+
+    def close(self):
+        self.daemon.close()
+
+
+class BgEventPlugin(ThreadedPlugin):
+    """alacritty_bg_event.Manager, fed through the host's connection."""
+
+    name = "bg-event"
+    events = ("window::focus", "window::new", "window::close")
+
+    def __init__(self, log_level: str = "info", log_json: bool = False):
+        super().__init__()
+        import alacritty_bg_event
+        self.listener = alacritty_bg_event.setup_logging(log_level, log_json)
+        self._module = alacritty_bg_event
+        self.manager = None
+
+    def setup(self, i3: SyncI3):
+        self.manager = self._module.Manager(i3)
+        self.manager.start()
+
+    def handle(self, event_name: str, event):
+        if event_name == "window::focus":
+            self.manager.on_focus(None, event)
+        elif event_name == "window::new":
+            self.manager.on_new(None, event)
+        else:
+            self.manager.on_close(None, event)
+
+    def close(self):
+        super().close()
+        self.listener.stop()
+
+
+class PicomSlidePlugin(ThreadedPlugin):
+    """dynamic_picom_slide.on_workspace; rewrites picom.conf off the loop."""
+
+    name = "picom-slide"
+
+    def __init__(self):
+        super().__init__()
+        import dynamic_picom_slide
+        self._module = dynamic_picom_slide
+        self.events = ("workspace::focus",) + dynamic_picom_slide.ORDER_EVENTS
+        self._i3 = None
+
+    def setup(self, i3: SyncI3):
+        self._i3 = i3
+        self._module.refresh_workspaces(i3)
+
+    def handle(self, event_name: str, event):
+        if event_name == "workspace::focus":
+            self._module.on_workspace(self._i3, event)
+        else:
+            self._module.on_workspace_change(self._i3, event)
+
+    def close(self):
+        super().close()
+        self._module.slide_config.cancel()
+
+
+class WindowDecorations:
+    """Owns the i3 connection and routes events to the hosted plugins."""
+
+    def __init__(self, plugins: list[Plugin]):
+        self.plugins = plugins
+        self.i3 = None
+        self.sync_i3 = None
+        # "window::focus" -> plugins handling it, in plugin order
+        self.routes: dict[str, list[Plugin]] = {}
+        for plugin in plugins:
+            for event_name in plugin.events:
+                self.routes.setdefault(event_name, []).append(plugin)
+
+    def _route(self, kind: str, event):
+        for plugin in self.routes.get(f"{kind}::{event.change}", ()):
+            plugin.dispatch(f"{kind}::{event.change}", event)
+
+    def on_window(self, i3: Connection, event: i3ipc.WindowEvent):
+        self._route("window", event)
+
+    def on_workspace(self, i3: Connection, event: i3ipc.WorkspaceEvent):
+        self._route("workspace", event)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        self.i3 = await Connection(auto_reconnect=True).connect()
+        self.sync_i3 = SyncI3(self.i3, loop)
+
+        # One handler per event type; changes are routed from the table
+        kinds = {event_name.split("::")[0] for event_name in self.routes}
+        if "window" in kinds:
+            self.i3.on(i3ipc.Event.WINDOW, self.on_window)
+        if "workspace" in kinds:
+            self.i3.on(i3ipc.Event.WORKSPACE, self.on_workspace)
+        loop.add_signal_handler(signal.SIGTERM, self.i3.main_quit)
+
+        started = []
+        try:
+            for plugin in self.plugins:
+                await plugin.start(self)
+                started.append(plugin)
+            await self.i3.main()
+        finally:
+            for plugin in started:
+                await plugin.stop()
+
+    def run(self):
+        """Start the plugins and listen for i3 events."""
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for plugin in self.plugins:
+                plugin.close()
+
+
+PLUGINS = ("focus-highlight", "bg-event", "picom-slide")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plugins", default="focus-highlight",
+                        help=f"comma-separated plugins to host, from: {', '.join(PLUGINS)}")
+    parser.add_argument("--focus-config", type=Path, default=FOCUS_HIGHLIGHT_DIR / "config.toml",
+                        help="config.toml for focus-highlight")
+    parser.add_argument("--log-level", default="info", choices=["debug", "info", "warning", "error"],
+                        help="log level for bg-event")
+    parser.add_argument("--log-json", action="store_true",
+                        help="JSON log lines for bg-event")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.plugins.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(PLUGINS))
+    if unknown:
+        parser.error(f"unknown plugins: {', '.join(unknown)}")
+    if "focus-highlight" in names and "bg-event" in names:
+        parser.error("focus-highlight and bg-event both recolor Alacritty backgrounds; pick one")
+
+    plugins = []
+    for name in dict.fromkeys(names):
+        if name == "focus-highlight":
+            plugins.append(FocusHighlightPlugin(args.focus_config))
+        elif name == "bg-event":
+            plugins.append(BgEventPlugin(args.log_level, args.log_json))
+        else:
+            plugins.append(PicomSlidePlugin())
+
+    WindowDecorations(plugins).run()
+
+
+if __name__ == "__main__":
+    main()